@@ -0,0 +1,275 @@
+"""
+Streams archives of Othello games through a position by position analysis, writing one JSON line per position.
+Each game is read, replayed with "othello.makeMove" and analysed in turn, so memory use does not grow with the
+size of the archive, and games are shared out to a pool of processes with only a few in flight at a time.
+
+Run as a program, e.g: "python analyze.py games.jsonl records.bin --workers 4 -o analysis.jsonl".
+Archives can be JSON lines from "selfplay.py", record files from "records.py" or text games as read by
+"othello.loadGame", which are analysed as a single position.
+"""
+
+import argparse
+import collections
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import othello
+import records
+
+# The fields of each position's analysis, in output order.
+FIELDS = ("game", "ply", "who", "move", "legal_moves", "score", "suggestion", "best_move", "best_score",
+          "played_score", "loss", "unit", "blunder")
+
+# Default blunder thresholds, in the unit of each kind of score: square weight points from
+# "othello.evaluateBits" (the weight of a corner), hundredths of a disc from pattern weights (3 discs),
+# and discs for positions the deep search solves to the end of the game.
+THRESHOLDS = {"points": 100, "hundredths": 300, "discs": 2}
+
+# Size of the transposition table each process analyses games with, in megabytes.
+TABLE_MB = 16
+# This process's table, made when the first game is analysed and then cleared for each game.
+_table = None
+
+def gameTable():
+    """
+        Returns this process's transposition table, emptied, so that a game's analysis does not depend on
+        which games the same process analysed before it.
+        
+        @return: - Type: TransTable
+                 - Content: The empty table.
+    """
+    global _table
+    if _table is None:
+        _table = othello.TransTable(TABLE_MB)
+    else:
+        _table.clear()
+    return _table
+
+def scoreUnit(empties, deepDepth):
+    """
+        Returns the unit of a position's deep search scores, from "THRESHOLDS".
+        
+        @param empties: The number of empty squares of the position.
+        @param deepDepth: The depth of the deep search.
+        @return: - Type: String
+                 - Content: "discs" if the search reaches the end of the game, so its scores are exact,
+                            otherwise the unit of the evaluation in use.
+    """
+    if deepDepth >= empties:
+        return "discs"
+    return "hundredths" if othello.getPatternWeights() is not None else "points"
+
+def readArchive(path):
+    """
+        Generator which reads the games of an archive one at a time, whatever its format.
+        
+        @param path: The path of a JSON lines, record or text game file.
+        @yield: - Type: Dictionary
+                - Content: A dictionary with the fields "board", "who" and "moves", where "moves" is a list of
+                           (row, column) tuples, with an empty tuple for a pass.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(records.RECORD_MAGIC))
+    
+    if magic == records.RECORD_MAGIC:
+        for game in records.readGames(path):
+            yield {"board": game["board"], "who": game["who"], "moves": game["moves"]}
+    elif magic[:1] == b"{":
+        start = othello.newGame("C", "C")["board"]
+        with open(path, "rt", encoding = "utf8") as f:
+            for line in f:
+                if line.strip():
+                    moves = json.loads(line)["moves"]
+                    yield {"board": [row[:] for row in start], "who": 1,
+                           "moves": [othello.strToIndex(m) if m is not None else tuple() for m in moves]}
+    else:
+        # "loadGame" prints its own errors, so keep them out of the output.
+        with contextlib.redirect_stdout(sys.stderr):
+            game = othello.loadGame(path)
+        # The analysis only works on 8x8 boards.
+        if game is not None and len(game["board"]) != 8:
+            print("Skipping", path + ", as its board is not 8x8.", file = sys.stderr)
+        elif game is not None:
+            yield {"board": game["board"], "who": game["who"], "moves": []}
+
+def readArchives(paths):
+    """
+        Generator which numbers the games of many archives in order.
+        
+        @param paths: A list of archive paths.
+        @yield: - Type: Tuple
+                - Content: A tuple (number, game) of each game from "readArchive".
+    """
+    number = 0
+    for path in paths:
+        for game in readArchive(path):
+            yield number, game
+            number += 1
+
+def deepScores(own, opp, who, played, depth, table):
+    """
+        Scores the best move and the played move of a position with a fixed depth search.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param who: The player to move, i.e 1 or 2.
+        @param played: The square index of the played move.
+        @param depth: The depth in plies to search to.
+        @param table: The TransTable to search with.
+        @return: - Type: Tuple
+                 - Content: A tuple (bestSq, bestScore, playedScore), with scores from the point of view of the
+                            player to move.
+    """
+    search = {"deadline": float("inf"), "nodes": 0, "move": -1, "score": -othello.INFINITY, "table": table}
+    bestSq, bestScore = othello.searchRoot(own, opp, depth, search, -1, othello.searchPatterns(own, opp, who))
+    if played == bestSq:
+        return bestSq, bestScore, bestScore
+    flips = othello.getFlipsBits(own, opp, played)
+    childOwn, childOpp = opp ^ flips, own | flips | (1 << played)
+    playedScore = -othello.negamax(childOwn, childOpp, depth - 1, -othello.INFINITY, othello.INFINITY, search,
+                                   othello.searchPatterns(childOwn, childOpp, 3 - who))
+    return bestSq, bestScore, playedScore
+
+def analyzeGame(number, game, aiDepth = 2, deepDepth = 4, thresholds = None):
+    """
+        Replays a game and analyses every position of it. Run by the worker processes of "analyze".
+        
+        @param number: The number of the game, to label its positions with.
+        @param game: A game dictionary from "readArchive".
+        @param aiDepth: The depth of the AI's suggested move, from "othello.suggestMove3".
+        @param deepDepth: The depth of the search that judges the played move, or 0 for no judging.
+        @param thresholds: A dictionary of how much worse than the best move a played move must score to be a
+                           blunder, in each unit of "THRESHOLDS", or None for "THRESHOLDS".
+        @return: - Type: List of dictionaries
+                 - Content: One dictionary per position with the fields FIELDS. "move" is None for a pass, or
+                            where no move was played, and the search fields are None where there was no move.
+                            "unit" is the unit of the scores, from "scoreUnit", and solved scores are given in
+                            discs rather than "othello.WIN_SCORE" per disc.
+    """
+    if thresholds is None:
+        thresholds = THRESHOLDS
+    table = gameTable()
+    results = list()
+    # A game with no moves, such as a text game, is just its starting position.
+    positions = records.replayGame(game) if game["moves"] else [(game["board"], game["who"], tuple())]
+    for ply, (board, who, move) in enumerate(positions):
+        own, opp = othello.splitBits(board, who)
+        moves = othello.getMovesBits(own, opp)
+        result = dict.fromkeys(FIELDS)
+        result.update({"game": number, "ply": ply, "who": who, "legal_moves": othello.popCount(moves),
+                       "move": othello.indexToStr(move) if move != tuple() else None,
+                       "score": othello.scoreBoard(board)})
+        if moves != 0:
+            suggestion = othello.suggestMove3(board, who, time_ms = float("inf"), depth = aiDepth, table = table,
+                                              endgame = 0)
+            result["suggestion"] = othello.indexToStr(suggestion)
+            if deepDepth > 0 and move != tuple():
+                bestSq, bestScore, playedScore = deepScores(own, opp, who, move[0]*8 + move[1], deepDepth, table)
+                unit = scoreUnit(64 - othello.popCount(own | opp), deepDepth)
+                if unit == "discs":
+                    bestScore //= othello.WIN_SCORE
+                    playedScore //= othello.WIN_SCORE
+                result.update({"best_move": othello.indexToStr(divmod(bestSq, 8)), "best_score": bestScore,
+                               "played_score": playedScore, "loss": bestScore - playedScore, "unit": unit,
+                               "blunder": bestScore - playedScore >= thresholds[unit]})
+        results.append(result)
+    return results
+
+def analyze(paths, workers = 1, aiDepth = 2, deepDepth = 4, thresholds = None, inFlight = None, weights = None):
+    """
+        Generator which analyses every position of many archives, in game order.
+        
+        @param paths: A list of archive paths.
+        @param workers: The number of worker processes, or 1 to analyse in this process.
+        @param aiDepth: As in "analyzeGame".
+        @param deepDepth: As in "analyzeGame".
+        @param thresholds: As in "analyzeGame".
+        @param inFlight: The most games being analysed or waiting to be written at once, or None for twice
+                         the number of workers. Reading stops while this many are waiting, which bounds memory.
+        @param weights: A pattern weight file for the searches to evaluate with, or None.
+        @yield: - Type: Dictionary
+                - Content: The analysis of each position, as from "analyzeGame".
+    """
+    games = readArchives(paths)
+    if weights is not None:
+        othello.setPatternWeights(weights)
+    if workers <= 1:
+        for number, game in games:
+            yield from analyzeGame(number, game, aiDepth, deepDepth, thresholds)
+        return
+    
+    if inFlight is None:
+        inFlight = 2 * workers
+    # Each worker loads the weights itself, as a new process may not share this one's memory.
+    initializer = othello.setPatternWeights if weights is not None else None
+    with ProcessPoolExecutor(workers, initializer = initializer, initargs = (weights,)) as pool:
+        # A bounded queue of futures in game order: a new game is only read once the oldest has been written.
+        pending = collections.deque()
+        for number, game in games:
+            pending.append(pool.submit(analyzeGame, number, game, aiDepth, deepDepth, thresholds))
+            if len(pending) >= inFlight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def columnChunks(results, size):
+    """
+        Generator which groups analysed positions into columns, for loading into data frames.
+        
+        @param results: An iterable of position dictionaries from "analyze".
+        @param size: The number of positions in each chunk.
+        @yield: - Type: Dictionary
+                - Content: A dictionary mapping each of FIELDS to a list of up to "size" values.
+    """
+    chunk = {field: list() for field in FIELDS}
+    count = 0
+    for result in results:
+        for field in FIELDS:
+            chunk[field].append(result[field])
+        count += 1
+        if count == size:
+            yield chunk
+            chunk = {field: list() for field in FIELDS}
+            count = 0
+    if count:
+        yield chunk
+
+def main():
+    parser = argparse.ArgumentParser(description = "Analyse every position of Othello game archives.")
+    parser.add_argument("archives", nargs = "+", help = "JSON lines, record or text game files.")
+    parser.add_argument("-o", "--output", help = "File to write to, instead of standard output.")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--in-flight", type = int, help = "Most games queued at once, by default twice the workers.")
+    parser.add_argument("--ai-depth", type = int, default = 2, help = "Search depth of the suggested move.")
+    parser.add_argument("--deep-depth", type = int, default = 4,
+                        help = "Search depth used to judge the played move, or 0 to skip blunder checks.")
+    parser.add_argument("--threshold", type = int, default = THRESHOLDS["points"],
+                        help = "Square weight points lost by a move to be a blunder, without --weights.")
+    parser.add_argument("--pattern-threshold", type = int, default = THRESHOLDS["hundredths"],
+                        help = "Hundredths of a disc lost by a move to be a blunder, with --weights.")
+    parser.add_argument("--endgame-threshold", type = int, default = THRESHOLDS["discs"],
+                        help = "Discs lost by a move to be a blunder, where the deep search solves the game.")
+    parser.add_argument("--columns", type = int, default = 0,
+                        help = "Write one line of columns per this many positions, instead of one per position.")
+    parser.add_argument("--weights", help = "Pattern weight file for the searches to evaluate with.")
+    args = parser.parse_args()
+    
+    thresholds = {"points": args.threshold, "hundredths": args.pattern_threshold, "discs": args.endgame_threshold}
+    results = analyze(args.archives, args.workers, args.ai_depth, args.deep_depth, thresholds, args.in_flight,
+                      args.weights)
+    if args.columns > 0:
+        results = columnChunks(results, args.columns)
+    
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Vectorised move generation for many Othello boards at once, using NumPy.
+Each board is turned into a pair of 64-bit bitboards, as in the Othello module, and the same shift-and-mask
+steps are done across the whole batch with no per-board Python loops.
+"""
+
+import numpy as np
+
+import othello
+
+# The shift and mask pairs of the Othello module, as NumPy unsigned 64-bit values.
+_SHIFTS_UP = [(np.uint64(shift), np.uint64(mask)) for shift, mask in othello.SHIFTS_UP]
+_SHIFTS_DOWN = [(np.uint64(shift), np.uint64(mask)) for shift, mask in othello.SHIFTS_DOWN]
+_ONE = np.uint64(1)
+
+def boardsToBits(boards, value):
+    """
+        Converts a batch of boards into a bitboard of the pieces of one value on each board.
+        
+        @param boards: An (N, 8, 8) uint8 array of boards, holding 0, 1 or 2 as in a "board".
+        @param value: The board value to convert, i.e 1 or 2, or an (N,) array of values, one per board.
+        @return: - Type: NumPy array
+                 - Content: An (N,) uint64 array where bit (row*8 + col) is set if the board holds "value" there.
+    """
+    n = boards.shape[0]
+    mask = boards.reshape(n, 64) == np.asarray(value, dtype = np.uint8).reshape(-1, 1)
+    return np.packbits(mask, axis = 1, bitorder = "little").view("<u8").reshape(n).astype(np.uint64)
+
+def bitsToMasks(bits):
+    """
+        Converts a batch of bitboards into boolean masks.
+        
+        @param bits: An (N,) uint64 array of bitboards.
+        @return: - Type: NumPy array
+                 - Content: An (N, 8, 8) bool array which is True where a bit is set.
+    """
+    n = bits.shape[0]
+    raw = np.ascontiguousarray(bits, dtype = "<u8").view(np.uint8).reshape(n, 8)
+    return np.unpackbits(raw, axis = 1, bitorder = "little").reshape(n, 8, 8).astype(bool)
+
+def splitBatch(boards, who):
+    """
+        Converts a batch of boards into bitboards ordered by the player to move on each board.
+        
+        @param boards: An (N, 8, 8) uint8 array of boards.
+        @param who: The player to move, i.e 1 or 2, or an (N,) array of players, one per board.
+        @return: - Type: Tuple
+                 - Content: A tuple (own, opp) of (N,) uint64 arrays.
+    """
+    who = np.broadcast_to(np.asarray(who, dtype = np.uint8), (boards.shape[0],))
+    return boardsToBits(boards, who), boardsToBits(boards, 3 - who)
+
+def getMovesBatch(own, opp):
+    """
+        Returns the valid moves of a batch of bitboards, the same as "othello.getMovesBits" for each board.
+        
+        @param own: An (N,) uint64 array of the pieces of the player to move.
+        @param opp: An (N,) uint64 array of the opponent's pieces.
+        @return: - Type: NumPy array
+                 - Content: An (N,) uint64 array of valid move bitboards.
+    """
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for shift, mask in _SHIFTS_UP:
+        oppMask = opp & mask
+        line = (own << shift) & oppMask
+        for i in range(5):
+            line |= (line << shift) & oppMask
+        moves |= (line << shift) & mask & empty
+    for shift, mask in _SHIFTS_DOWN:
+        oppMask = opp & mask
+        line = (own >> shift) & oppMask
+        for i in range(5):
+            line |= (line >> shift) & oppMask
+        moves |= (line >> shift) & mask & empty
+    return moves
+
+def getFlipsBatch(own, opp, squares):
+    """
+        Returns the pieces flipped by a move on each of a batch of bitboards.
+        
+        @param own: An (N,) uint64 array of the pieces of the player to move.
+        @param opp: An (N,) uint64 array of the opponent's pieces.
+        @param squares: An (N,) integer array of the square index, i.e row*8 + col, of each move,
+                        or -1 for no move.
+        @return: - Type: NumPy array
+                 - Content: An (N,) uint64 array of the flipped pieces of each board.
+    """
+    squares = np.asarray(squares)
+    bit = np.where(squares >= 0, _ONE << np.clip(squares, 0, 63).astype(np.uint64), np.uint64(0))
+    flips = np.zeros_like(own)
+    
+    # Follow the run of opponent pieces from the move in each direction, keeping it if it ends on our own piece.
+    for shift, mask in _SHIFTS_UP:
+        oppMask = opp & mask
+        line = (bit << shift) & oppMask
+        for i in range(5):
+            line |= (line << shift) & oppMask
+        flips |= np.where((line << shift) & mask & own != 0, line, np.uint64(0))
+    for shift, mask in _SHIFTS_DOWN:
+        oppMask = opp & mask
+        line = (bit >> shift) & oppMask
+        for i in range(5):
+            line |= (line >> shift) & oppMask
+        flips |= np.where((line >> shift) & mask & own != 0, line, np.uint64(0))
+    return flips
+
+def getValidMovesBatch(boards, who):
+    """
+        Returns the valid moves of a batch of boards, the same as "othello.getValidMoves" for each board.
+        
+        @param boards: An (N, 8, 8) uint8 array of boards, holding 0, 1 or 2 as in a "board".
+        @param who: The player to move, i.e 1 or 2, or an (N,) array of players, one per board.
+        @return: - Type: NumPy array
+                 - Content: An (N, 8, 8) bool array which is True on every valid move.
+    """
+    own, opp = splitBatch(boards, who)
+    return bitsToMasks(getMovesBatch(own, opp))
+
+def makeMoveBatch(boards, moves, who):
+    """
+        Makes a move on each of a batch of boards, flipping any pieces if needed, the same as "othello.makeMove".
+        Note that it expects correct moves, and does not test against them.
+        
+        @param boards: An (N, 8, 8) uint8 array of boards.
+        @param moves: An (N,) integer array of the square index, i.e row*8 + col, of each move,
+                      or -1 to leave a board as it is.
+        @param who: The player to move, i.e 1 or 2, or an (N,) array of players, one per board.
+        @return: - Type: NumPy array
+                 - Content: A new (N, 8, 8) uint8 array of the boards after the moves.
+    """
+    n = boards.shape[0]
+    who = np.broadcast_to(np.asarray(who, dtype = np.uint8), (n,))
+    moves = np.asarray(moves)
+    own, opp = splitBatch(boards, who)
+    
+    # Paint the flipped pieces, and the placed piece, with the mover's value.
+    changed = bitsToMasks(getFlipsBatch(own, opp, moves))
+    played = moves >= 0
+    changed.reshape(n, 64)[np.nonzero(played)[0], moves[played]] = True
+    return np.where(changed, who.reshape(n, 1, 1), boards).astype(np.uint8)
+
+# The square weights of the Othello module's evaluation, as a vector over square indexes.
+_SQUARE_WEIGHTS = np.array(othello.SQUARE_WEIGHTS, dtype = np.int64)
+
+def popCountBatch(bits):
+    """
+        Returns the number of set bits of each of a batch of bitboards.
+        
+        @param bits: An (N,) uint64 array of bitboards.
+        @return: - Type: NumPy array
+                 - Content: An (N,) int64 array of counts.
+    """
+    return bitsToMasks(bits).reshape(bits.shape[0], 64).sum(axis = 1, dtype = np.int64)
+
+def evaluateBatch(own, opp):
+    """
+        Scores a batch of bitboards, the same as "othello.evaluateBits" for each one, except that finished
+        games are scored as in "othello.negamax".
+        
+        @param own: An (N,) uint64 array of the pieces of the player to move.
+        @param opp: An (N,) uint64 array of the opponent's pieces.
+        @return: - Type: NumPy array
+                 - Content: An (N,) int64 array of scores from the point of view of the player to move.
+    """
+    n = own.shape[0]
+    ownMasks = bitsToMasks(own).reshape(n, 64)
+    oppMasks = bitsToMasks(opp).reshape(n, 64)
+    ownMoves = popCountBatch(getMovesBatch(own, opp))
+    oppMoves = popCountBatch(getMovesBatch(opp, own))
+    score = ownMasks @ _SQUARE_WEIGHTS - oppMasks @ _SQUARE_WEIGHTS + 5 * (ownMoves - oppMoves)
+    over = (ownMoves == 0) & (oppMoves == 0)
+    return np.where(over, othello.WIN_SCORE * (ownMasks.sum(axis = 1) - oppMasks.sum(axis = 1)), score)
+
+def expandBatch(own, opp):
+    """
+        Makes every valid move of every board of a batch.
+        
+        @param own: An (N,) uint64 array of the pieces of the player to move.
+        @param opp: An (N,) uint64 array of the opponent's pieces.
+        @return: - Type: Tuple
+                 - Content: A tuple (parents, squares, childOwn, childOpp) with one entry per move: the index of
+                            the board it was made on, its square index, and the new bitboards from the point of
+                            view of the next player to move.
+    """
+    n = own.shape[0]
+    parents, squares = np.nonzero(bitsToMasks(getMovesBatch(own, opp)).reshape(n, 64))
+    flips = getFlipsBatch(own[parents], opp[parents], squares)
+    childOpp = own[parents] | flips | (_ONE << squares.astype(np.uint64))
+    childOwn = opp[parents] ^ flips
+    return parents, squares, childOwn, childOpp
@@ -0,0 +1,406 @@
+"""
+Benchmarks for the Othello module.
+Run as a program, e.g: "python benchmark.py suite -o results.json" or
+"python benchmark.py parallel --depth 6 --workers 1 2 4 8".
+"python benchmark.py symmetry" checks the pattern evaluation gives every symmetric copy of a position one score.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import othello
+
+def makeCorpus(games = 20, seed = 1):
+    """
+        Plays seeded random games and returns every position reached, so the same positions are used
+        on every run and every machine.
+        
+        @param games: The number of games to play.
+        @param seed: The seed of the random number generator.
+        @return: - Type: List of tuples
+                 - Content: A list of (board, who) tuples, where "who" has at least one valid move on "board".
+    """
+    rand = random.Random(seed)
+    corpus = list()
+    for g in range(games):
+        board = othello.newGame("C", "C")["board"]
+        who = 1
+        while True:
+            moves = othello.getValidMoves(board, who)
+            if moves == []:
+                # Pass, unless neither player can move.
+                who = 3 - who
+                if othello.getValidMoves(board, who) == []:
+                    break
+                continue
+            corpus.append(([line[:] for line in board], who))
+            othello.makeMove(board, rand.choice(moves), who)
+            who = 3 - who
+    return corpus
+
+def pickPositions(corpus, plies, step = 1):
+    """
+        Returns the positions of the corpus that have a given number of pieces on the board.
+        
+        @param corpus: A list of (board, who) tuples from "makeCorpus".
+        @param plies: A list of the number of moves made so far, e.g: [10, 20, 30].
+        @param step: Only keep every "step"th matching position.
+        @return: - Type: List of tuples
+                 - Content: The matching (board, who) tuples.
+    """
+    # Each move places one piece on top of the 4 starting pieces.
+    return [pos for pos in corpus if sum(8 - line.count(0) for line in pos[0]) - 4 in plies][::step]
+
+def benchParallel(positions, depth, workerCounts):
+    """
+        Times "suggestMoveParallel" over the same positions for each number of workers.
+        
+        @param positions: A list of (board, who) tuples to search.
+        @param depth: The depth in plies to search to.
+        @param workerCounts: A list of the number of workers to time, e.g: [1, 2, 4, 8].
+        @return: - Type: List of dictionaries
+                 - Content: One dictionary per worker count, with fields "workers", "seconds" and "speedup".
+    """
+    results = list()
+    for workers in workerCounts:
+        with ProcessPoolExecutor(workers) as pool:
+            # Start every worker before the clock starts, and empty the main process's table so that
+            # no run gains from the one before.
+            othello.setTransTable(othello.DEFAULT_TABLE_MB)
+            list(pool.map(othello.popCount, range(workers)))
+            start = time.perf_counter()
+            for board, who in positions:
+                othello.suggestMoveParallel(board, who, depth, workers, pool)
+            seconds = time.perf_counter() - start
+        results.append({"workers": workers, "seconds": round(seconds, 4),
+                        "speedup": round(results[0]["seconds"] / seconds, 2) if results else 1.0})
+    return results
+
+def percentile(sortedValues, p):
+    """
+        Returns the "p" percentile of a sorted list, using the nearest rank.
+        
+        @param sortedValues: A sorted, non-empty list of numbers.
+        @param p: The percentile, between 0 and 100.
+        @return: - Type: Number
+                 - Content: The value at that percentile.
+    """
+    return sortedValues[min(len(sortedValues) - 1, int(p / 100 * len(sortedValues)))]
+
+def timeCalls(fn, argsList):
+    """
+        Calls a function once for each set of arguments, timing every call on its own.
+        
+        @param fn: The function to time.
+        @param argsList: A list of argument tuples, one per call.
+        @return: - Type: List of floats
+                 - Content: The time taken by each call in seconds.
+    """
+    clock = time.perf_counter
+    times = list()
+    for args in argsList:
+        start = clock()
+        fn(*args)
+        times.append(clock() - start)
+    return times
+
+def summarise(name, times, nodes = None):
+    """
+        Summarises the timings of a benchmark.
+        
+        @param name: The name of the benchmark.
+        @param times: A list of the time taken by each call in seconds.
+        @param nodes: The total number of search nodes visited, if the benchmark is a search.
+        @return: - Type: Dictionary
+                 - Content: A dictionary with the fields "name", "calls", "ops_per_sec", "p50_us", "p99_us"
+                            and, for searches, "nodes_per_sec".
+    """
+    total = sum(times)
+    times = sorted(times)
+    result = {"name": name,
+              "calls": len(times),
+              "ops_per_sec": round(len(times) / total, 1),
+              "p50_us": round(percentile(times, 50) * 1e6, 2),
+              "p99_us": round(percentile(times, 99) * 1e6, 2)}
+    if nodes is not None:
+        result["nodes_per_sec"] = round(nodes / total, 1)
+    return result
+
+def searchNodes(board, who, depth):
+    """
+        Runs a fixed depth search of a position and returns the number of nodes it visited.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The player to move, i.e 1 or 2.
+        @param depth: The depth in plies to search to.
+        @return: - Type: Integer
+                 - Content: The number of nodes searched.
+    """
+    own, opp = othello.splitBits(board, who)
+    search = {"deadline": float("inf"), "nodes": 0, "move": -1, "score": 0, "table": None}
+    othello.searchRoot(own, opp, depth, search)
+    return search["nodes"]
+
+def benchSuite(corpus, searchDepth = 3, aiStep = 10):
+    """
+        Benchmarks the move generator, move application, scoring and AI functions over a corpus of positions.
+        
+        @param corpus: A list of (board, who) tuples from "makeCorpus".
+        @param searchDepth: The fixed depth used to time the search AI.
+        @param aiStep: Only time the AIs on every "aiStep"th position, as they are much slower.
+        @return: - Type: List of dictionaries
+                 - Content: The result of "summarise" for each benchmark.
+    """
+    results = list()
+    
+    # Every line from every empty square, as "getValidMoves" used to do.
+    lineArgs = [(board, who, (row, col), dir)
+                for board, who in corpus[::aiStep]
+                for row in range(8) for col in range(8) if board[row][col] == 0
+                for dir in othello.dir2DVect()]
+    results.append(summarise("getLine", timeCalls(othello.getLine, lineArgs)))
+    
+    results.append(summarise("getValidMoves", timeCalls(othello.getValidMoves, corpus)))
+    results.append(summarise("scoreBoard", timeCalls(othello.scoreBoard, [(board,) for board, who in corpus])))
+    
+    # Every valid move of every position, each on its own copy of the board.
+    moveArgs = [([line[:] for line in board], move, who)
+                for board, who in corpus
+                for move in othello.getValidMoves(board, who)]
+    results.append(summarise("makeMove", timeCalls(othello.makeMove, moveArgs)))
+    
+    aiPositions = corpus[::aiStep]
+    results.append(summarise("suggestMove1", timeCalls(othello.suggestMove1, aiPositions)))
+    results.append(summarise("suggestMove2", timeCalls(othello.suggestMove2, aiPositions)))
+    
+    # The search is run without a transposition table so that every position costs the same on every run.
+    nodes = 0
+    times = list()
+    for board, who in aiPositions:
+        start = time.perf_counter()
+        nodes += searchNodes(board, who, searchDepth)
+        times.append(time.perf_counter() - start)
+    results.append(summarise("search_depth_" + str(searchDepth), times, nodes))
+    
+    return results
+
+def benchPerft(depth, bulk = True, engine = "bits"):
+    """
+        Runs perft from the starting position to each depth up to "depth", checking the counts against
+        the known values.
+        
+        @param depth: The deepest depth to count to.
+        @param bulk: If True, count the moves at the last ply instead of making them.
+        @param engine: "bits" to count on the bitboards, or "board" to count with "getValidMoves" and "makeMove".
+        @return: - Type: List of dictionaries
+                 - Content: One dictionary per depth, with fields "depth", "nodes", "expected", "ok", "seconds"
+                            and "nodes_per_sec".
+    """
+    board = othello.newGame("C", "C")["board"]
+    own, opp = othello.splitBits(board, 1)
+    results = list()
+    for d in range(1, depth + 1):
+        start = time.perf_counter()
+        if engine == "bits":
+            nodes = othello.perftBits(own, opp, d, bulk)
+        else:
+            nodes = othello.perft(board, 1, d, bulk)
+        seconds = time.perf_counter() - start
+        expected = othello.PERFT_COUNTS[d] if d < len(othello.PERFT_COUNTS) else None
+        results.append({"depth": d, "nodes": nodes, "expected": expected,
+                        "ok": expected is None or nodes == expected,
+                        "seconds": round(seconds, 4), "nodes_per_sec": round(nodes / seconds, 1) if seconds else None})
+    return results
+
+def benchEndgame(corpus, empties, count = 5):
+    """
+        Times the exact endgame solver on positions of the corpus with a given number of empty squares.
+        
+        @param corpus: A list of (board, who) tuples from "makeCorpus".
+        @param empties: The number of empty squares of the positions to solve.
+        @param count: The number of positions to solve.
+        @return: - Type: List of dictionaries
+                 - Content: One dictionary per position, with fields "empties", "move", "score", "nodes",
+                            "seconds" and "nodes_per_sec".
+    """
+    positions = [pos for pos in corpus if sum(line.count(0) for line in pos[0]) == empties][:count]
+    results = list()
+    for board, who in positions:
+        own, opp = othello.splitBits(board, who)
+        search = {"deadline": float("inf"), "nodes": 0}
+        start = time.perf_counter()
+        sq, score = othello.solveRoot(own, opp, search)
+        seconds = time.perf_counter() - start
+        results.append({"empties": empties, "move": othello.indexToStr(divmod(sq, 8)) if sq != -1 else None,
+                        "score": score, "nodes": search["nodes"], "seconds": round(seconds, 4),
+                        "nodes_per_sec": round(search["nodes"] / seconds, 1)})
+    return results
+
+def checkPatternSymmetry(corpus, weights = None, seed = 1):
+    """
+        Checks that the pattern evaluation gives the same score for all 8 symmetric copies of each position.
+        
+        @param corpus: A list of (board, who) tuples from "makeCorpus".
+        @param weights: A pattern weight file, or None for random weights.
+        @param seed: The seed of the random weights.
+        @return: - Type: Dictionary
+                 - Content: The fields "positions", "asymmetric" (the number of positions whose copies
+                            scored differently) and "ok".
+    """
+    if weights is not None:
+        weights = othello.loadPatternWeights(weights)
+    else:
+        rand = random.Random(seed)
+        weights = [[[rand.randint(-1000, 1000) for i in range(size)] for size in othello.PATTERN_SIZES]
+                   for stage in range(4)]
+    asymmetric = 0
+    for board, who in corpus:
+        p1Bits, p2Bits = othello.boardToBits(board)
+        discs = othello.popCount(p1Bits | p2Bits)
+        scores = set()
+        for sym in range(8):
+            indexes = othello.patternIndexes(othello.symmetryBits(p1Bits, sym), othello.symmetryBits(p2Bits, sym))
+            scores.add(othello.evaluatePatterns(indexes, discs, weights))
+        if len(scores) > 1:
+            asymmetric += 1
+    return {"positions": len(corpus), "asymmetric": asymmetric, "ok": asymmetric == 0}
+
+def benchMCTS(positions, time_ms, rave = False, bias = 0.0, workers = 1):
+    """
+        Measures the playout rate of the Monte Carlo search on a set of positions.
+        
+        @param positions: A list of (board, who) tuples.
+        @param time_ms: The time budget of each search in milliseconds.
+        @param rave: Whether to use RAVE.
+        @param bias: The weight of the progressive bias.
+        @param workers: The number of worker processes.
+        @return: - Type: List of dictionaries
+                 - Content: One dictionary per position, with fields "empties", "move", "playouts", "seconds"
+                            and "playouts_per_sec".
+    """
+    results = list()
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for board, who in positions:
+            report = dict()
+            # Search each position from a new tree, so that the playout rate is not flattered by reuse.
+            tree = othello.MCTSTree(*othello.splitBits(board, who), rave = rave, bias = bias)
+            move = othello.suggestMove4(board, who, None, time_ms, rave, bias, tree, workers, executor, report)
+            results.append({"empties": sum(line.count(0) for line in board),
+                            "move": othello.indexToStr(move) if move != tuple() else None,
+                            "playouts": report.get("playouts", 0), "seconds": round(report.get("seconds", 0.0), 4),
+                            "playouts_per_sec": round(report.get("playouts_per_sec", 0.0), 1)})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return results
+
+def machineInfo():
+    """
+        Returns details of the machine and code being benchmarked, so results can be compared across commits.
+        
+        @return: - Type: Dictionary
+                 - Content: A dictionary with the fields "commit", "python", "platform" and "time".
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True,
+                                cwd = sys.path[0] or ".").stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmarks for the Othello module.")
+    sub = parser.add_subparsers(dest = "bench", required = True)
+    
+    suite = sub.add_parser("suite", help = "Move generation, move application and AI speed over a fixed corpus.")
+    suite.add_argument("--games", type = int, default = 20, help = "Number of seeded games in the corpus.")
+    suite.add_argument("--seed", type = int, default = 1)
+    suite.add_argument("--depth", type = int, default = 3, help = "Depth of the timed search.")
+    suite.add_argument("-o", "--output", help = "File to write the JSON results to, instead of standard output.")
+    
+    pft = sub.add_parser("perft", help = "Perft node counts from the starting position, checked against known values.")
+    pft.add_argument("--depth", type = int, default = 8)
+    pft.add_argument("--engine", choices = ["bits", "board"], default = "bits")
+    pft.add_argument("--no-bulk", action = "store_true", help = "Make every move at the last ply instead of counting them.")
+    
+    end = sub.add_parser("endgame", help = "Time to solve positions exactly with a number of empty squares.")
+    end.add_argument("--empties", type = int, nargs = "+", default = [10, 12, 14])
+    end.add_argument("--count", type = int, default = 5, help = "Positions to solve for each number of empties.")
+    end.add_argument("--seed", type = int, default = 1)
+    
+    par = sub.add_parser("parallel", help = "Speedup of the parallel search against the number of workers.")
+    par.add_argument("--depth", type = int, default = 6)
+    par.add_argument("--workers", type = int, nargs = "+", default = [1, 2, 4, 8])
+    par.add_argument("--seed", type = int, default = 1)
+    
+    mc = sub.add_parser("mcts", help = "Playouts per second of the Monte Carlo search.")
+    mc.add_argument("--time-ms", type = int, default = 1000)
+    mc.add_argument("--rave", action = "store_true")
+    mc.add_argument("--bias", type = float, default = 0.0)
+    mc.add_argument("--workers", type = int, default = 1)
+    mc.add_argument("--seed", type = int, default = 1)
+    
+    sym = sub.add_parser("symmetry", help = "Check the pattern evaluation is the same for every symmetric copy.")
+    sym.add_argument("--weights", help = "Pattern weight file to check, instead of random weights.")
+    sym.add_argument("--games", type = int, default = 4)
+    sym.add_argument("--seed", type = int, default = 1)
+    
+    args = parser.parse_args()
+    
+    if args.bench == "suite":
+        # Keep the AIs' printing out of the results.
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            corpus = makeCorpus(args.games, args.seed)
+            report = {"machine": machineInfo(),
+                      "corpus": {"games": args.games, "seed": args.seed, "positions": len(corpus)},
+                      "results": benchSuite(corpus, args.depth)}
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        text = json.dumps(report, indent = 2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+    elif args.bench == "perft":
+        failed = False
+        for result in benchPerft(args.depth, not args.no_bulk, args.engine):
+            print(json.dumps(result))
+            failed = failed or not result["ok"]
+        if failed:
+            sys.exit(1)
+    elif args.bench == "endgame":
+        corpus = makeCorpus(args.count, args.seed)
+        for empties in args.empties:
+            for result in benchEndgame(corpus, empties, args.count):
+                print(json.dumps(result))
+    elif args.bench == "parallel":
+        positions = pickPositions(makeCorpus(4, args.seed), [10, 20, 30, 40])
+        for result in benchParallel(positions, args.depth, args.workers):
+            print(json.dumps(result))
+    elif args.bench == "mcts":
+        positions = pickPositions(makeCorpus(4, args.seed), [10, 30, 50])
+        for result in benchMCTS(positions, args.time_ms, args.rave, args.bias, args.workers):
+            print(json.dumps(result))
+    elif args.bench == "symmetry":
+        result = checkPatternSymmetry(makeCorpus(args.games, args.seed), args.weights, args.seed)
+        print(json.dumps(result))
+        if not result["ok"]:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
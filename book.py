@@ -0,0 +1,129 @@
+"""
+Builds opening books for the Othello module, from deep searches of the opening and from self-play games.
+Run as a program, e.g: "python book.py -o book.bin --plies 8 --depth 6 --games games.jsonl".
+The AIs use a book once it has been opened with "othello.setBook".
+"""
+
+import argparse
+import json
+
+import othello
+
+def scoreMoves(own, opp, depth, table):
+    """
+        Scores every move of a position with a fixed depth search.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param depth: The depth in plies to search each move to.
+        @param table: The TransTable to search with.
+        @return: - Type: Dictionary
+                 - Content: A dictionary of {square: score}, from the point of view of the player to move.
+    """
+    search = {"deadline": float("inf"), "nodes": 0, "table": table}
+    scores = dict()
+    for sq in othello.bitsToSquares(othello.getMovesBits(own, opp)):
+        flips = othello.getFlipsBits(own, opp, sq)
+        scores[sq] = -othello.negamax(opp ^ flips, own | flips | (1 << sq), depth - 1,
+                                      -othello.INFINITY, othello.INFINITY, search)
+    return scores
+
+def buildFromSearch(plies, depth, width):
+    """
+        Builds a book by searching every position reached by following the best moves from the start.
+        
+        @param plies: The number of moves deep the book goes.
+        @param depth: The depth in plies each move is searched to.
+        @param width: The number of best moves of each position to follow into the next ply.
+        @return: - Type: Dictionary
+                 - Content: A dictionary mapping each canonical position hash to a dictionary of {square: score},
+                            as taken by "othello.writeBook".
+    """
+    book = dict()
+    table = othello.TransTable()
+    own, opp = othello.splitBits(othello.newGame("C", "C")["board"], 1)
+    layer = [(own, opp)]
+    for ply in range(plies):
+        nextLayer = list()
+        for own, opp in layer:
+            # Symmetric copies of a position already searched are skipped, as they share its book entry.
+            key, sym = othello.canonicalHash(own, opp)
+            if key in book:
+                continue
+            if othello.getMovesBits(own, opp) == 0:
+                # Follow a pass, unless the game is over.
+                if othello.getMovesBits(opp, own) != 0:
+                    nextLayer.append((opp, own))
+                continue
+            scores = scoreMoves(own, opp, depth, table)
+            toCanonical = othello.SYMMETRY_SQUARES[sym]
+            book[key] = {toCanonical[sq]: score for sq, score in scores.items()}
+            for sq in sorted(scores, key = lambda sq: -scores[sq])[:width]:
+                flips = othello.getFlipsBits(own, opp, sq)
+                nextLayer.append((opp ^ flips, own | flips | (1 << sq)))
+        layer = nextLayer
+    return book
+
+def buildFromGames(path, plies, minGames = 2):
+    """
+        Builds a book from games written by "selfplay.py", scoring each move by the average final score
+        of the games it was played in.
+        
+        @param path: The path of a JSON lines file of games.
+        @param plies: The number of moves of each game to put in the book.
+        @param minGames: The number of games a move must have been played in to be kept.
+        @return: - Type: Dictionary
+                 - Content: A dictionary mapping each canonical position hash to a dictionary of {square: score},
+                            as taken by "othello.writeBook".
+    """
+    totals = dict()
+    with open(path, "rt", encoding = "utf8") as f:
+        for line in f:
+            game = json.loads(line)
+            own, opp = othello.splitBits(othello.newGame("C", "C")["board"], 1)
+            who = 1
+            for move in game["moves"][:plies]:
+                if move is not None:
+                    sq = "abcdefgh".index(move[0]) + 8 * (int(move[1]) - 1)
+                    # The final score from the point of view of the player to move.
+                    score = game["score"] if who == 1 else -game["score"]
+                    # Games reaching symmetric copies of a position are counted together.
+                    key, sym = othello.canonicalHash(own, opp)
+                    moves = totals.setdefault(key, dict())
+                    canonicalSq = othello.SYMMETRY_SQUARES[sym][sq]
+                    total, count = moves.get(canonicalSq, (0, 0))
+                    moves[canonicalSq] = (total + score, count + 1)
+                    flips = othello.getFlipsBits(own, opp, sq)
+                    own, opp = own | flips | (1 << sq), opp ^ flips
+                own, opp = opp, own
+                who = 3 - who
+    
+    # Scale the average disc difference to the search's scores, so both kinds of entry can be mixed.
+    book = dict()
+    for key, moves in totals.items():
+        kept = {sq: othello.WIN_SCORE * total // count for sq, (total, count) in moves.items() if count >= minGames}
+        if kept:
+            book[key] = kept
+    return book
+
+def main():
+    parser = argparse.ArgumentParser(description = "Build an Othello opening book.")
+    parser.add_argument("-o", "--output", required = True, help = "The book file to write.")
+    parser.add_argument("--plies", type = int, default = 8, help = "Number of moves deep the book goes.")
+    parser.add_argument("--depth", type = int, default = 6, help = "Search depth of each move, or 0 for no searching.")
+    parser.add_argument("--width", type = int, default = 2, help = "Best moves of each position to follow.")
+    parser.add_argument("--games", help = "A JSON lines file of games from selfplay.py to add to the book.")
+    parser.add_argument("--min-games", type = int, default = 2, help = "Games a move must be played in to be kept.")
+    args = parser.parse_args()
+    
+    book = dict()
+    if args.games:
+        book.update(buildFromGames(args.games, args.plies, args.min_games))
+    # Searched positions replace those from games, as every move of them has been scored.
+    if args.depth > 0:
+        book.update(buildFromSearch(args.plies, args.depth, args.width))
+    
+    print(len(book), "positions,", othello.writeBook(args.output, book), "moves written to", args.output)
+
+if __name__ == "__main__":
+    main()
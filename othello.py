@@ -2,47 +2,69 @@
 A Python module for the Othello game.
 """
 
-# Used for copying a variable.
-from copy import deepcopy
+# Used for the time budget of the search.
+import time
+# Used for the Zobrist hash numbers.
+import random
+# Used for the fixed size transposition table.
+from array import array
+# Used for reading the opening book.
+import mmap
+import struct
+# Used for the byte order of the pattern weight file.
+import sys
+# Used for dumping instrumentation stats.
+import json
+# Used for pondering in the background.
+import threading
+# Used for the UCT formula of the Monte Carlo search.
+import math
+# Used for the quiet and log options when run as a program.
+import argparse
+# Used for the parallel search.
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-def newGame(player1,player2):
+def newGame(player1,player2,size=8):
     """
         Initiliases a new game dictionary and then returns it, whos fields are set to initial values, and fields 
         "player1", "player2" are set according to the arguments given.
         
         @param 'player1': Non-empty string representing player 1's name or "C" for an ai player.
         @param 'player2': Non-empty string representing player 2's name or "C" for an ai player.
+        @param 'size': The number of rows and columns of the board, from BOARD_SIZES.
         @return: - Type: Dictionary
                  - Content: A dictionary containing the fields: "player1", "player2", "who" and "board",
                             where "player1", "player2" are set from arguments, and "who", "board" are 
                             preset intial values.
-        @throws: - ValueError: If either argument for the player names is empty.
+        @throws: - ValueError: If either argument for the player names is empty, or the size is not supported.
     """
     try:   
         # Check if arguments are empty.
         if len(str(player1)) == 0: raise ValueError(1)
         if len(str(player2)) == 0: raise ValueError(2)
+        if size not in BOARD_SIZES: raise ValueError(3)
         
         # Initlise the dictionary.
         game = {
                  "player1" : player1,
                  "player2" : player2,
                  "who" : 1,
-                 "board" :  [
-                             [0,0,0,0,0,0,0,0],
-                             [0,0,0,0,0,0,0,0],
-                             [0,0,0,0,0,0,0,0],
-                             [0,0,0,2,1,0,0,0],
-                             [0,0,0,1,2,0,0,0],
-                             [0,0,0,0,0,0,0,0],
-                             [0,0,0,0,0,0,0,0],
-                             [0,0,0,0,0,0,0,0]
-                             ]
+                 "board" :  [[0]*size for row in range(size)]
                 }
+        # Place the 4 starting pieces in the middle of the board.
+        mid = size // 2
+        game["board"][mid-1][mid-1] = 2
+        game["board"][mid-1][mid] = 1
+        game["board"][mid][mid-1] = 1
+        game["board"][mid][mid] = 2
         # Return the initilisation.
         return game
     except ValueError as e:
-        print("Player " + str(e.args[0]) + " name, should be non-empty.")
+        if e.args[0] == 3:
+            print("Board size must be even and from 4 to 26, not:", size)
+        else:
+            print("Player " + str(e.args[0]) + " name, should be non-empty.")
 
 def alphaRange(start, stop, step = 1):
     """
@@ -61,69 +83,74 @@ def alphaRange(start, stop, step = 1):
         if char >= chr(ord(stop)-step): break
         char = chr(ord(char)+step)
 
-def printBoard(board):
+# The text of each cell value of the board, in the width of a printed cell. Any other value is a KeyError.
+BOARD_PIECES = {0: "   ", 1: " X ", 2: " O "}
+
+# Templates of the printed board of each size, with a "{}" for every cell, so they are only built once.
+_boardTemplates = dict()
+
+def boardTemplate(size):
+    """
+        Returns the template of the printed board of a size, building it the first time the size is used.
+        
+        @param 'size': The number of rows and columns of the board.
+        @return: - Type: String
+                 - Content: The whole printed board, ending in a new line, with "{}" in place of each cell
+                            in (row, column) order, to be filled in with BOARD_PIECES.
+    """
+    template = _boardTemplates.get(size)
+    if template is None:
+        horiSpace = 3
+        blank = ("{:^"+str(horiSpace)+"}").format("")
+        border = blank + "+" + (("{:-^"+str(horiSpace)+"}").format("") + "+")*size
+        # First Line.
+        lines = [blank + "|" + "".join(("{:^"+str(horiSpace)+"}").format(i) + "|" for i in alphaRange("a", chr(size+97)))]
+        # Second Line.
+        lines.append(border)
+        # Lines of the board rows.
+        for row in range(size):
+            lines.append(("{:^"+str(horiSpace)+"}").format(row+1) + "|" + "{}|"*size)
+        # Last Line.
+        lines.append(border)
+        template = _boardTemplates[size] = "\n".join(lines) + "\n"
+    return template
+
+def printBoard(board, file = None):
     """
         Prints a correctly formated "board" argument to console.
+        The board is filled into a template made once per board size, and written in one go.
         
         @param 'board': A list of lists represting the Othello board in (row, column).
+        @param 'file': The file to write to, or None for the console.
         @return: - Type: void
                  - Content: N/A
         @throws: - TypeError: If the argument is of wrong type (e.g: if the argument is a 
                                                                 incorrectly formatted dictionary, or wrong type).
     """
     try:
-        # Check argument is of correct type.
-        if not isinstance(board, list): raise TypeError(type(board))
-        for i in board:
-            if not isinstance(i, list): raise TypeError(type(i))
-        
-        # Initlise some variables.
-        horiSpace = 3
-        maxHori = len(board[0])
-        maxVert = len(board)+3
-        printString = ""
-        
-        # Print the Table
-        for j in range(maxVert):
-            # First Line.
-            if j == 0:
-                printString += ("{:^"+str(horiSpace)+"}").format("") + "|"
-                for i in alphaRange("a", chr(maxHori+97)):
-                    printString += ("{:^"+str(horiSpace)+"}").format(i) + "|"
-            # Second Line.
-            elif j == 1: 
-                printString += ("{:^"+str(horiSpace)+"}").format("") + "+"
-                for i in range(maxHori):
-                    printString += ("{:-^"+str(horiSpace)+"}").format("") + "+"
-            # 3rd - 9th Line.
-            elif j in range(2, 10):
-                printString += ("{:^"+str(horiSpace)+"}").format(j-1) + "|"
-                for i in range(maxHori):
-                    if board[j-2][i] == 0:
-                        printString += ("{:^"+str(horiSpace)+"}").format("") + "|"
-                    elif board[j-2][i] == 1:
-                        printString += ("{:^"+str(horiSpace)+"}").format("X") + "|"
-                    elif board[j-2][i] == 2:
-                        printString += ("{:^"+str(horiSpace)+"}").format("O") + "|"
-            # Last Line.
-            else:
-                printString += ("{:^"+str(horiSpace)+"}").format("") + "+"
-                for i in range(maxHori):
-                    printString += ("{:-^"+str(horiSpace)+"}").format("") + "+"
-            # Print the string that has been correctly formated, and then clear for next line. 
-            print(printString)
-            printString = ""
-        
-        # Return nothing as of now. @todo: Maybe return a bool for success?
+        # Every row must be as long as the board, as the template would quietly drop extra cells.
+        size = len(board)
+        for line in board:
+            if len(line) != size: raise ValueError(len(line))
+        text = boardTemplate(size).format(*[BOARD_PIECES[num] for line in board for num in line])
+    except (TypeError, IndexError, KeyError, ValueError):
+        # Only check the argument's type once it cannot be printed, to say what is wrong with it.
+        try:
+            if not isinstance(board, list): raise TypeError(type(board))
+            for i in board:
+                if not isinstance(i, list): raise TypeError(type(i))
+            print("Board must be square, with only the values 0, 1 and 2.")
+        except TypeError as e:
+            print("Argument must be lists of a list, not: ", str(e.args[0]))
         return
-    except TypeError as e:
-        print("Argument must be lists of a list, not: ", str(e.args[0]))
+    (sys.stdout if file is None else file).write(text)
 
-def strToIndex(s):
+def strToIndex(s, size=8):
     """
         Converts a string coordinate into a tuple index coordinate for the "board" variable.
         
-        @param 's': String of coordinate. E.g: "a1" or "3d"
+        @param 's': String of coordinate. E.g: "a1" or "3d", or "j10" on a 10x10 board.
+        @param 'size': The number of rows and columns of the board.
         @return: - Type: Tuple
                  - Content: A tuple t, such that t[0] = row coordiate, t[1] = col coordinate.
         @throws: - TypeError: If the argument is of wrong type (e.g: not a string).
@@ -136,42 +163,32 @@ def strToIndex(s):
         #Get rid of spaces in string.
         s = "".join(s.split(" "))
         
-        #Initiliase some values.
-        row = 0
-        col = 0
-        
-        #Check size of string is exactly 2.
-        if len(s) != 2: raise ValueError((s, 1))
+        #Check size of string is a character and a number of at most as many digits as the size.
+        if len(s) < 2 or len(s) > len(str(size)) + 1: raise ValueError((s, 1))
         
-        # Check first element of string.
-        if s[0].isdigit():
-            if int(s[0]) > 8: raise ValueError((s, 2))
-            row = int(s[0])-1
+        # Split the string into the character and the number, which can come in either order.
+        if s[0].isalpha():
+            char, num = s[0], s[1:]
         else:
-            if not s[0].lower() in alphaRange("a", "i"): raise ValueError((s, 3))
-            col = ord(s[0])-97
-        # Check second element of string.
-        if s[1].isdigit():
-            if int(s[1]) > 8: raise ValueError((s, 2))
-            row = int(s[1])-1
-        else:
-            if not s[1].lower() in alphaRange("a", "i"): raise ValueError((s, 3))
-            col = ord(s[1])-97
+            char, num = s[-1], s[:-1]
             
-        # Check both elements of the string, for 2 integers, or 2 characters.    
-        if (s[0].isdigit() and s[1].isdigit()) or (s[0].isalpha() and s[1].isalpha()): raise ValueError((s, 4))
+        # Check the string is one character and one number.
+        if not (char.isalpha() and num.isdigit()): raise ValueError((s, 4))
+        # Check the number and character are on the board.
+        if int(num) > size: raise ValueError((s, 2))
+        if not char.lower() in alphaRange("a", chr(size+97)): raise ValueError((s, 3))
     
-        return (row, col)
+        return (int(num)-1, ord(char.lower())-97)
     except TypeError as e:
         print("Error: Argument must be a string, not: ", str(e.args[0]))
         return ""
     except ValueError as e:
         if e.args[0][1] == 1:
-            print("Error: String '", e.args[0][0],"' must only have a size of 2.")
+            print("Error: String '", e.args[0][0],"' must only have a size of 2" + (".", " or 3.")[size > 9])
         elif e.args[0][1] == 2:
-            print("Error: String '", e.args[0][0],"' cannot contain a number not in 1-8.")
+            print("Error: String '", e.args[0][0],"' cannot contain a number not in 1-" + str(size) + ".")
         elif e.args[0][1] == 3:
-            print("Error: String '", e.args[0][0],"' cannot contain a character not in a-h.")
+            print("Error: String '", e.args[0][0],"' cannot contain a character not in a-" + chr(size+96) + ".")
         elif e.args[0][1] ==4:
             print("Error: String '", e.args[0][0],"' must be of the form Character-Number or Number-Character.")
         return ""
@@ -191,27 +208,32 @@ def isInt(n):
     except ValueError:
         return False
     
-def indexToStr(t):
+def indexToStr(t, size=8):
     """
         Converts a tuple index to a 2 character string based on the position on the console board.
         
         @param 't': Tuple of (row, column).
+        @param 'size': The number of rows and columns of the board.
         @return: - Type: String
                  - Content: 2 Character coordinate string of the front-end table.
     """
     try:
-        if t[0] < 8 and t[1] < 8 and isInt(t[0]) and isInt(t[0]):
+        if t[0] < size and t[1] < size and isInt(t[0]) and isInt(t[0]):
             return str(chr(t[1]+97)) + str(t[0]+1)
         else: raise ValueError
     except ValueError:
-        print("Argument must have row and column index coordinate be an integer < 8.")
+        print("Argument must have row and column index coordinate be an integer < " + str(size) + ".")
+
+# The name of each square of the 8x8 board, by square index, as from "indexToStr".
+SQUARE_NAMES = tuple(chr(col+97) + str(row+1) for row in range(8) for col in range(8))
 
-def loadGame():
+def loadGame(path = "game.txt"):
     """
         Attempts to load the game from the "game.txt" file.
         If it succeeds, then returns a game dictionary of the current game.
         Note that the "game.txt" file must be in the same folder as the python file.
         
+        @param path: The path of the file to load, "game.txt" by default.
         @return: - Type: Dictionary
                  - Content: A dictionary containing the fields: "player1", "player2", "who" and "board",
                             where "player1", "player2", "who", "board" are set from the file "game.txt".
@@ -220,7 +242,7 @@ def loadGame():
     """
     try:
         # Open file
-        with open("game.txt", mode = "rt", encoding = "utf8") as f:
+        with open(path, mode = "rt", encoding = "utf8") as f:
             # Pull first 2 lines under the assumption they are the names.
             player1 = "".join((f.readline()).split("\n"))
             player2 = "".join((f.readline()).split("\n"))
@@ -238,12 +260,14 @@ def loadGame():
             # Update dictionary with the "who" value.
             game["who"] = int(line)
             
-            # Test and set the remaining lines to the dict.
-            for indx, line in enumerate(f):
+            # Test and set the remaining lines to the dict, where the number of lines gives the board size.
+            board = list()
+            for line in f:
                 line = "".join(line.split(","))
                 line = "".join(line.split("\n"))
-                if len(line) != 8: raise ValueError
-                game["board"][indx] = [int(x) for x in line]
+                board.append([int(x) for x in line])
+            if len(board) not in BOARD_SIZES or any(len(line) != len(board) for line in board): raise ValueError
+            game["board"] = board
         
         return game
     
@@ -252,6 +276,327 @@ def loadGame():
     except ValueError:
         print("Error: Content format is not correct.")
 
+# ------------------- Bitboard engine --------------------
+# The board can also be held as two 64-bit integers, one per player, where bit (row*8 + col)
+# is set if that player has a piece on that square. Moves and flips are then found with
+# shifts and masks on the whole board at once, instead of walking the list of lists.
+
+# Mask of all 64 squares.
+FULL_MASK = (1 << 64) - 1
+# Masks that clear column "a" and column "h" respectively, to stop shifts wrapping round a row.
+NOT_A_FILE = 0xfefefefefefefefe
+NOT_H_FILE = 0x7f7f7f7f7f7f7f7f
+
+# (shift, mask) pairs for the directions that move towards higher bits, i.e (0, 1), (1, 0), (1, 1), (1, -1).
+# The mask is the set of squares a piece may legally land on after the shift.
+SHIFTS_UP = ((1, NOT_A_FILE), (8, FULL_MASK), (9, NOT_A_FILE), (7, NOT_H_FILE))
+# (shift, mask) pairs for the directions that move towards lower bits, i.e (0, -1), (-1, 0), (-1, -1), (-1, 1).
+SHIFTS_DOWN = ((1, NOT_H_FILE), (8, FULL_MASK), (9, NOT_H_FILE), (7, NOT_A_FILE))
+
+# Translation tables used to turn a string of board values into a binary string for each player.
+_P1_TRANS = str.maketrans("012", "010")
+_P2_TRANS = str.maketrans("012", "001")
+
+def boardToBits(board):
+    """
+        Converts a "board" into a pair of bitboards, one for each player.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @return: - Type: Tuple
+                 - Content: A tuple (p1Bits, p2Bits) of integers, where bit (row*8 + col) is set if that
+                            player has a piece on that position, or bit (row*size + col) on other board sizes.
+    """
+    # Flatten the board into a string, reversed so that position (0, 0) becomes the lowest bit.
+    s = "".join(map(str, [num for line in board for num in line]))[::-1]
+    return int(s.translate(_P1_TRANS), 2), int(s.translate(_P2_TRANS), 2)
+
+def bitsToBoard(p1Bits, p2Bits, size = 8):
+    """
+        Converts a pair of bitboards back into a list of lists "board".
+        
+        @param p1Bits: Bitboard of player 1's pieces.
+        @param p2Bits: Bitboard of player 2's pieces.
+        @param size: The number of rows and columns of the board.
+        @return: - Type: List of Lists
+                 - Content: The "board" represting the Othello board in (row, column).
+    """
+    return [[1 if (p1Bits >> (row*size + col)) & 1 else 2 if (p2Bits >> (row*size + col)) & 1 else 0
+             for col in range(size)]
+            for row in range(size)]
+
+def splitBits(board, who):
+    """
+        Converts a "board" into a pair of bitboards ordered by the player "who".
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The current players value, i.e 1 or 2.
+        @return: - Type: Tuple
+                 - Content: A tuple (ownBits, oppBits) of "who"'s pieces and the opponent's pieces.
+    """
+    p1Bits, p2Bits = boardToBits(board)
+    if who == 1:
+        return p1Bits, p2Bits
+    return p2Bits, p1Bits
+
+def popCount(bits):
+    """
+        Returns the number of set bits in a bitboard.
+        
+        @param bits: A bitboard integer.
+        @return: - Type: Integer
+                 - Content: The number of pieces on the bitboard.
+    """
+    return bin(bits).count("1")
+
+def getMovesBits(own, opp):
+    """
+        Returns a bitboard of all valid moves for the player owning "own" against "opp".
+        
+        @param own: Bitboard of the current player's pieces.
+        @param opp: Bitboard of the opponent's pieces.
+        @return: - Type: Integer
+                 - Content: A bitboard with a bit set on every position that is a valid move.
+    """
+    empty = ~(own | opp) & FULL_MASK
+    moves = 0
+    
+    # Flood out from our pieces over runs of opponent pieces in every direction, and a move is valid
+    # wherever such a run ends on an empty square. A run can be at most 6 pieces long.
+    for shift, mask in SHIFTS_UP:
+        oppMask = opp & mask
+        line = (own << shift) & oppMask
+        line |= (line << shift) & oppMask
+        line |= (line << shift) & oppMask
+        line |= (line << shift) & oppMask
+        line |= (line << shift) & oppMask
+        line |= (line << shift) & oppMask
+        moves |= (line << shift) & mask & empty
+    for shift, mask in SHIFTS_DOWN:
+        oppMask = opp & mask
+        line = (own >> shift) & oppMask
+        line |= (line >> shift) & oppMask
+        line |= (line >> shift) & oppMask
+        line |= (line >> shift) & oppMask
+        line |= (line >> shift) & oppMask
+        line |= (line >> shift) & oppMask
+        moves |= (line >> shift) & mask & empty
+    
+    return moves
+
+def getFlipsBits(own, opp, sq):
+    """
+        Returns a bitboard of the opponent pieces that would be flipped by placing a piece on square "sq".
+        
+        @param own: Bitboard of the current player's pieces.
+        @param opp: Bitboard of the opponent's pieces.
+        @param sq: The square index of the move, i.e row*8 + col.
+        @return: - Type: Integer
+                 - Content: A bitboard of all the pieces to be flipped.
+    """
+    flips = 0
+    bit = 1 << sq
+    
+    # Walk out from the square in each direction, and keep the line if it is closed by our own piece.
+    for shift, mask in SHIFTS_UP:
+        line = 0
+        cur = (bit << shift) & mask
+        while cur & opp:
+            line |= cur
+            cur = (cur << shift) & mask
+        if cur & own:
+            flips |= line
+    for shift, mask in SHIFTS_DOWN:
+        line = 0
+        cur = (bit >> shift) & mask
+        while cur & opp:
+            line |= cur
+            cur = (cur >> shift) & mask
+        if cur & own:
+            flips |= line
+    
+    return flips
+
+def bitsToSquares(bits):
+    """
+        Simple yield function which yields the square index of every set bit, from lowest to highest.
+        
+        @param bits: A bitboard integer.
+        @yield: - Type: Integer
+                - Content: The square index, i.e row*8 + col, of a set bit.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def scoreBits(p1Bits, p2Bits):
+    """
+        Returns the difference in score of player 1 and player 2 from a pair of bitboards.
+        
+        @param p1Bits: Bitboard of player 1's pieces.
+        @param p2Bits: Bitboard of player 2's pieces.
+        @return: - Type: Integer
+                 - Content: The number of player 1's pieces minus the number of player 2's pieces.
+    """
+    return popCount(p1Bits) - popCount(p2Bits)
+
+# ------------------- Ray tables --------------------
+# The 8 possible unit directions on the board, in (row, column).
+ALL_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (-1, 1), (1, -1))
+# Index of each direction in ALL_DIRECTIONS.
+DIRECTION_INDEX = {dir: i for i, dir in enumerate(ALL_DIRECTIONS)}
+
+# RAYS[sq][d] is the tuple of (row, column) positions walking from square sq = row*8 + col in direction
+# ALL_DIRECTIONS[d], up to the edge of the board, not including sq itself.
+RAYS = tuple(
+    tuple(
+        tuple((row + cnt*dir[0], col + cnt*dir[1]) for cnt in range(1, 8)
+              if 0 <= row + cnt*dir[0] <= 7 and 0 <= col + cnt*dir[1] <= 7)
+        for dir in ALL_DIRECTIONS)
+    for row in range(8) for col in range(8))
+# The rays of each square that are long enough to capture along, i.e at least 2 positions.
+CAPTURE_RAYS = tuple(tuple(ray for ray in rays if len(ray) >= 2) for rays in RAYS)
+# The (row, column) positions next to each square.
+NEIGHBOURS = tuple(tuple(ray[0] for ray in rays if ray) for rays in RAYS)
+
+def getFrontier(board):
+    """
+        Returns the frontier of a board, i.e the empty squares next to at least one piece. Only these
+        squares can ever be valid moves.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @return: - Type: Set of integers
+                 - Content: The square indexes, i.e row*8 + col, of the frontier.
+    """
+    return {sq for sq in range(64)
+            if board[sq >> 3][sq & 7] == 0 and any(board[r][c] != 0 for r, c in NEIGHBOURS[sq])}
+
+def updateFrontier(frontier, board, move):
+    """
+        Updates a frontier set in place after a piece has been placed on "move".
+        
+        @param frontier: The frontier set from "getFrontier", before the move.
+        @param board: A list of lists represting the Othello board in (row, column), after the move.
+        @param move: The (row, column) tuple of the move.
+        @return: - Type: List of integers
+                 - Content: The squares added to the frontier, so the update can be taken back with
+                            "frontier.difference_update(added)" and "frontier.add(sq)".
+    """
+    frontier.discard(move[0]*8 + move[1])
+    added = [r*8 + c for r, c in NEIGHBOURS[move[0]*8 + move[1]] if board[r][c] == 0 and r*8 + c not in frontier]
+    frontier.update(added)
+    return added
+
+# ------------------- Board sizes --------------------
+# The list functions above and the bitboard functions below also work on square boards of other sizes,
+# using tables built once per size. The size must be even, so the 4 starting pieces sit in the middle,
+# and at most 26 so every column has a letter.
+BOARD_SIZES = range(4, 27, 2)
+
+def _sizedMoveFunctions(size):
+    """
+        Builds "getMovesBits" and "getFlipsBits" for a board size, with bit (row*size + col) for each square.
+        The masks and shifts are bound into the functions, so they run as fast as the 8x8 ones.
+        
+        @param size: The number of rows and columns of the board.
+        @return: - Type: Tuple
+                 - Content: A tuple (getMoves, getFlips) of functions taking the same arguments as
+                            "getMovesBits" and "getFlipsBits".
+    """
+    full = (1 << size*size) - 1
+    notAFile = sum(1 << (row*size + col) for row in range(size) for col in range(1, size))
+    notHFile = sum(1 << (row*size + col) for row in range(size) for col in range(size - 1))
+    shiftsUp = ((1, notAFile), (size, full), (size + 1, notAFile), (size - 1, notHFile))
+    shiftsDown = ((1, notHFile), (size, full), (size + 1, notHFile), (size - 1, notAFile))
+    # A run of opponent pieces can be at most size - 2 long, and the first step is taken before the loop.
+    steps = range(size - 3)
+    
+    def getMoves(own, opp):
+        empty = ~(own | opp) & full
+        moves = 0
+        for shift, mask in shiftsUp:
+            oppMask = opp & mask
+            line = (own << shift) & oppMask
+            for _ in steps:
+                line |= (line << shift) & oppMask
+            moves |= (line << shift) & mask & empty
+        for shift, mask in shiftsDown:
+            oppMask = opp & mask
+            line = (own >> shift) & oppMask
+            for _ in steps:
+                line |= (line >> shift) & oppMask
+            moves |= (line >> shift) & mask & empty
+        return moves
+    
+    def getFlips(own, opp, sq):
+        flips = 0
+        bit = 1 << sq
+        for shift, mask in shiftsUp:
+            line = 0
+            cur = (bit << shift) & mask
+            while cur & opp:
+                line |= cur
+                cur = (cur << shift) & mask
+            if cur & own:
+                flips |= line
+        for shift, mask in shiftsDown:
+            line = 0
+            cur = (bit >> shift) & mask
+            while cur & opp:
+                line |= cur
+                cur = (cur >> shift) & mask
+            if cur & own:
+                flips |= line
+        return flips
+    
+    return getMoves, getFlips
+
+class BoardTables:
+    """
+        The ray tables and bitboard move functions of one board size. Use "boardTables" to get the shared
+        tables of a size instead of making new ones. The 8x8 tables are the module's own.
+    """
+    __slots__ = ("size", "fullMask", "rays", "captureRays", "neighbours", "getMoves", "getFlips")
+    
+    def __init__(self, size):
+        """
+            @param size: The number of rows and columns of the board.
+        """
+        self.size = size
+        self.fullMask = (1 << size*size) - 1
+        if size == 8:
+            self.rays, self.captureRays, self.neighbours = RAYS, CAPTURE_RAYS, NEIGHBOURS
+            self.getMoves, self.getFlips = getMovesBits, getFlipsBits
+            return
+        # The same as RAYS, CAPTURE_RAYS and NEIGHBOURS, indexed by row*size + col.
+        self.rays = tuple(
+            tuple(
+                tuple((row + cnt*dir[0], col + cnt*dir[1]) for cnt in range(1, size)
+                      if 0 <= row + cnt*dir[0] < size and 0 <= col + cnt*dir[1] < size)
+                for dir in ALL_DIRECTIONS)
+            for row in range(size) for col in range(size))
+        self.captureRays = tuple(tuple(ray for ray in rays if len(ray) >= 2) for rays in self.rays)
+        self.neighbours = tuple(tuple(ray[0] for ray in rays if ray) for rays in self.rays)
+        self.getMoves, self.getFlips = _sizedMoveFunctions(size)
+
+# Tables of each board size that has been used, so they are only built once.
+_boardTables = dict()
+
+def boardTables(size):
+    """
+        Returns the tables of a board size, building them the first time the size is used.
+        
+        @param size: The number of rows and columns of the board.
+        @return: - Type: BoardTables
+                 - Content: The shared tables of the size.
+        @throws: - ValueError: If the size is not in BOARD_SIZES.
+    """
+    tables = _boardTables.get(size)
+    if tables is None:
+        if size not in BOARD_SIZES: raise ValueError(size)
+        tables = _boardTables[size] = BoardTables(size)
+    return tables
+
 def getLine(board,who,pos,dir):
     """
         Returns a list of all positions of the opponents pieces in a line, from a position, in a direction,
@@ -264,29 +609,25 @@ def getLine(board,who,pos,dir):
                             e.g: [(1,2), (1, 3)]
     """
     #Initlise parameters.
-    cnt = 0
-    posList = list() 
+    posList = list()
+    opp = 3 - who
     
-    # Keep looping till the end point of the line has been reached.
-    while True:
-        # Increase the counter.
-        cnt += 1
-        # Test to see if the position and direction list go out of the boards bounds, if so then return an empty list.
-        if ( (pos[0]+(cnt*dir[0]) > 7) or 
-             (pos[1]+(cnt*dir[1]) > 7) or 
-             (pos[0]+(cnt*dir[0]) < 0) or 
-             (pos[1]+(cnt*dir[1]) < 0) ):
-            return []
+    # Walk along the precomputed ray from the position in the direction, to the edge of the board.
+    size = len(board)
+    rays = RAYS if size == 8 else boardTables(size).rays
+    for r, c in rays[pos[0]*size + pos[1]][DIRECTION_INDEX[(dir[0], dir[1])]]:
         # Test to see if the next piece is an opponent piece, if so add to the posList.
-        elif board[pos[0]+(cnt*dir[0])][pos[1]+(cnt*dir[1])] == [x for x in [1,2] if x != who][0]:
-            posList.append((pos[0]+(cnt*dir[0]), pos[1]+(cnt*dir[1])))
+        if board[r][c] == opp:
+            posList.append((r, c))
         # Test to see if the next piece is your own piece, if so then a line has been formed, so return the posList.
-        elif board[pos[0]+(cnt*dir[0])][pos[1]+(cnt*dir[1])] == [x for x in [1,2] if x == who][0]:
+        elif board[r][c] == who:
             return posList
         # If nothing is valid then just return an empty list.
         else:
             return []
-
+    
+    # The edge of the board has been reached, so return an empty list.
+    return []
 
 def dir2DVect():
     """
@@ -295,40 +636,49 @@ def dir2DVect():
         @yield: - Type: tuple
                 - Content: Unit direction corresponding to the possible directions for a othello board.
     """
-    allDir = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (-1, 1), (1, -1)]
-    for i in allDir:        
+    for i in ALL_DIRECTIONS:
         yield i
 
-def getValidMoves(board,who):
+def getValidMoves(board,who,frontier=None):
     """
         Returns a list of all valid moves the player "who" can make for a board "board".
         
         @param board: A list of lists represting the Othello board in (row, column).
         @param who: The current players value, i.e 1 or 2.
+        @param frontier: The board's frontier set from "getFrontier", if the caller keeps one up to date,
+                         so that only those squares are checked. Otherwise every empty square is checked.
+                         Only for 8x8 boards.
         @return: - Type: List of tuples
                  - Content: A list of tuple positions correspond to the (row, column) of the board which are valid moves to make.
     """
     
     # Empty list to add valid positions.
     validMoves = list()
+    opp = 3 - who
     
-    # Iterate through the rows
-    for row, line in enumerate(board):
-        # Iterate through the columns
-        for col, num in enumerate(line):
-            # Check if current position has no pieces on it.
-            if num == 0:
-                # Iterate through all possible direction vectors. @todo Maybe change for readability.
-                for dir in dir2DVect():
-                    # Check for a valid line in each direction for the current position.
-                    if getLine(board, who, (row, col), dir) != []:
-                        # Add to valid list if true.
-                        validMoves.append((row, col))
-                        # Once a line has been detected and added to list, dont need to cary on checking for other dirctions.
-                        break
-            else:
-                # Go to next position.
-                pass
+    # Get the squares that could be moves, in (row, column) order.
+    size = len(board)
+    captureRays = CAPTURE_RAYS if size == 8 else boardTables(size).captureRays
+    if frontier is None:
+        squares = [row*size + col for row, line in enumerate(board) for col, num in enumerate(line) if num == 0]
+    else:
+        squares = sorted(frontier)
+    
+    for sq in squares:
+        # Check for a valid line along each ray of the current position.
+        for ray in captureRays[sq]:
+            # The line must start with an opponent piece.
+            r, c = ray[0]
+            if board[r][c] != opp:
+                continue
+            # Skip over the opponent pieces, and check the line is closed by one of our pieces.
+            for r, c in ray:
+                if board[r][c] != opp:
+                    break
+            if board[r][c] == who:
+                # Once a line has been detected and added to list, dont need to cary on checking for other dirctions.
+                validMoves.append(divmod(sq, size))
+                break
     
     # Return the list of valid moves.
     return validMoves
@@ -345,22 +695,65 @@ def makeMove(board,move,who):
                  - Content: The "board", which has been updated with the move given, with all pieces flipped
                             if needed.
     """
-    
+    makeMoveUndo(board, move, who)
+    return board
+
+def makeMoveUndo(board,move,who):
+    """
+        Makes a Othello move on the board given in place, flipping any pieces if needed, and returns the
+        pieces that were flipped so that the move can be taken back with "unmakeMove".
+        Note that it expects a correct move, and does not test against it.
+        The search's hot loop does not use this, as "negamax" works on bitboards, making a move as
+        "opp ^ flips" and taking it back by keeping the parent's bitboards, so it does no allocations. A
+        bitboard undo record here was tried, but walking its bits back onto the list board in Python was
+        slower than this short list.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param move: A tuple of the row and column, i.e (row, column) of the position to place a piece of player who.
+        @param who: The current players value, i.e 1 or 2.
+        @return: - Type: List of tuples
+                 - Content: The undo record, i.e the (row, column) positions of all the flipped pieces.
+    """
     # Place a piece of type who on the position move.
     board[move[0]][move[1]] = who
     
-    # Get a list of all the opponent piece that need to be changed to who's pieces.
-    oppPieces = [getLine(board, who, move, dir) 
-        for dir in dir2DVect()
-        if getLine(board, who, move, dir) != []
-        ]
+    # Get a list of all the opponent pieces that need to be changed to who's pieces, by walking each ray
+    # from the move over opponent pieces, and keeping the line if it is closed by one of who's pieces.
+    opp = 3 - who
+    flipped = list()
+    size = len(board)
+    captureRays = CAPTURE_RAYS if size == 8 else boardTables(size).captureRays
+    for ray in captureRays[move[0]*size + move[1]]:
+        for cnt, (r, c) in enumerate(ray):
+            if board[r][c] != opp:
+                if cnt > 0 and board[r][c] == who:
+                    flipped.extend(ray[:cnt])
+                break
     
-    # Update the newBoard, with the flipped oponent pieces.
-    for posLines in oppPieces:
-        for pos in posLines:
-            board[pos[0]][pos[1]] = who  
+    # Update the board, with the flipped oponent pieces.
+    for r, c in flipped:
+        board[r][c] = who
     
-    return board
+    return flipped
+
+def unmakeMove(board,move,who,flipped):
+    """
+        Takes back a move made by "makeMoveUndo", restoring the board in place to how it was before the move.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param move: The (row, column) tuple of the move that was made.
+        @param who: The value of the player who made the move, i.e 1 or 2.
+        @param flipped: The undo record returned by "makeMoveUndo" for the move.
+        @return: - Type: void
+                 - Content: N/A
+    """
+    # Remove the placed piece.
+    board[move[0]][move[1]] = 0
+    
+    # Flip the pieces back to the opponent.
+    opp = 3 - who
+    for pos in flipped:
+        board[pos[0]][pos[1]] = opp
 
 def scoreBoard(board):
     """
@@ -371,48 +764,37 @@ def scoreBoard(board):
                             between the 2 players.
     """
     
-    # Initilise the players score variables.
-    play1Score = 0
-    play2Score = 0
-    
-    # Iterate through each value of the board
-    for rowLine in board:
-        for num in rowLine:
-            # Test if the value is players 1 piece, if so add 1 to there score.
-            if num == 1:
-                play1Score += 1
-            # Test if the value is players 2 piece, if so add 1 to there score.
-            elif num == 2:
-                play2Score += 1
-    
     # Return the difference in players 1 score to player 2 score.
     # A positive number means player 1 is winning, and a negative score means player 2 is winning.
     # If it equals 0, then they are drawing.
-    return play1Score - play2Score
+    return scoreBits(*boardToBits(board))
 
-def suggestMove1(board,who):
+def suggestMove1(board,who,position=None):
     """
         Returns a tuple of a "ideal" position on the board for "who" to place there piece.
         @param board: A list of lists represting the Othello board in (row, column).
         @param who: The current players value, i.e 1 or 2.
+        @param position: A Position of "board" with "who" to move, to reuse its cached moves and counts,
+                         or None to make one.
         @return: - Type: Tuple
                  - Content: A (row, height) tuple position on the "board" based on the position
                             which would give the biggest score increase.
     """
     
     # Initlise some variables using functions already made.
-    valMoves = getValidMoves(board, who)
-    curScore = scoreBoard(board)
+    if position is None:
+        position = Position(board, who)
+    valMoves = position.validMoves()
+    curScore = position.score()
     bestMove = tuple()
     
     # Loop through all possible valid moves.
     for move in valMoves:
-        # Create a copy of the board.
-        board2 = deepcopy(board)
-        # Make a move on the copied board.
-        makeMove(board2, move, who)
-        # Find the new score variable of the copied modified board.
-        newScore = scoreBoard(board2)
+        # Make the move on the board, keeping the undo record to take it back with.
+        undo = position.makeMove(move)
+        # Find the new score variable of the modified board, and then take the move back.
+        newScore = position.score()
+        position.unmakeMove(undo)
         # Check the new score against the current score, judging based on "who" whether
         # the new Score is better than the current score.
         # i.e For player 2, a new lower score means a better move, whereas for player 1,
@@ -455,7 +837,7 @@ def isSide(pos):
         return True
     else: return False
 
-def suggestMove2(board, who):
+def suggestMove2(board, who, position = None, verbose = False):
     """
         Returns a tuple of a "ideal" position on the board for "who" to place there piece.
         This algorithm is based on the idea on the idea of giving each valid move a unique weight depending 
@@ -463,15 +845,25 @@ def suggestMove2(board, who):
         
         @param board: A list of lists represting the Othello board in (row, column).
         @param who: The current players value, i.e 1 or 2.
-        @return: - Type: void
-                 - Content: N/A
+        @param position: A Position of "board" with "who" to move, to reuse its cached moves and counts,
+                         or None to make one.
+        @param verbose: Whether to print the weight of every move.
         @return: - Type: Tuple
                  - Content: A (row, height) tuple position on the "board".
     """
     #@todo Add weight to counter opponent moves.
     
+    if position is None:
+        position = Position(board, who)
+    
+    # Play the book move if there is one.
+    if _openingBook is not None:
+        bookSq = bookMove(*position.ownOpp())
+        if bookSq != -1:
+            return divmod(bookSq, 8)
+    
     # Initlise some variables using functions already made.
-    valMoves = getValidMoves(board, who)
+    valMoves = position.validMoves()
     weight = [0 for x in valMoves]
     bestMove = tuple()
     
@@ -483,7 +875,7 @@ def suggestMove2(board, who):
     oppSideWeight = -5
     
     # Find the position that given most score.
-    maxScoreMove = suggestMove1(board, who)
+    maxScoreMove = suggestMove1(board, who, position)
     
     # Iterate through each move, finding the weighting of placing a piece there.
     for indx, move in enumerate(valMoves):
@@ -495,171 +887,2349 @@ def suggestMove2(board, who):
         # Max Score weight
         if move == maxScoreMove:
             weight[indx] += maxScoreWeight
-        # Take a copy of the board and place the piece there.
-        cpBoard = deepcopy(board)
-        makeMove(cpBoard, move, who)
+        # Place the piece there, keeping the undo record to take it back with.
+        undo = position.makeMove(move)
         # Check if the opponent can now place a corner weight.
-        for oppMove in getValidMoves(cpBoard, [x for x in [1,2] if x != who][0]):
+        for oppMove in position.validMoves():
             if isCorner(oppMove):
                 weight[indx] += oppCorWeight
             if isSide(oppMove):
                 weight[indx] += oppSideWeight
+        # Take the move back.
+        position.unmakeMove(undo)
             
     # Attempt to find the max weight if there are valid moves.
     try:
         bestMove = valMoves[weight.index(max(weight))]
-        print("Weight of move is:", max(weight))
-        print("Weight list is:", weight)
+        if verbose:
+            print("Weight of move is:", max(weight))
+            print("Weight list is:", weight)
     # If not ignore enforce the bestMove as an empty tuple.
     except ValueError:
         bestMove = tuple()
     # Then return the move.
     return bestMove
 
-# ------------------- Main function --------------------
-def play():
+# ------------------- Position --------------------
+def _rotate32(h):
     """
-        Plays the game Orthello in the command console.
+        Swaps the 2 halves of a 64-bit hash, as "zobristHash" does to the opponent's hash.
+    """
+    return ((h << 32) | (h >> 32)) & FULL_MASK
+
+class Position:
+    """
+        A board together with the player to move, which keeps the piece counts, bitboards, Zobrist hashes,
+        frontier and valid moves of the board up to date as moves are made, so none of them need a full
+        scan of the board. The "board" list is updated in place, so it can still be printed or shared.
+    """
+    __slots__ = ("board", "who", "counts", "bits", "hashes", "frontier", "moves")
+    
+    def __init__(self, board, who = 1):
+        """
+            @param board: A list of lists represting the Othello board in (row, column). It is used, not copied.
+            @param who: The player to move, i.e 1 or 2.
+        """
+        self.board = board
+        self.who = who
+        p1Bits, p2Bits = boardToBits(board)
+        # Indexed by player value, so index 0 is unused.
+        self.bits = [0, p1Bits, p2Bits]
+        self.counts = [0, popCount(p1Bits), popCount(p2Bits)]
+        self.hashes = [0, zobristBits(p1Bits), zobristBits(p2Bits)]
+        self.frontier = getFrontier(board)
+        # Cached valid moves of each player, or None if they have not been found yet.
+        self.moves = [None, None, None]
+    
+    def validMoves(self, who = None):
+        """
+            Returns the valid moves of a player, finding them only once per position.
+            
+            @param who: The player, or None for the player to move.
+            @return: - Type: List of tuples
+                     - Content: The (row, column) valid moves, as from "getValidMoves". Must not be changed.
+        """
+        if who is None:
+            who = self.who
+        if self.moves[who] is None:
+            self.moves[who] = getValidMoves(self.board, who, self.frontier)
+        return self.moves[who]
+    
+    def score(self):
+        """
+            @return: - Type: Integer
+                     - Content: The same as "scoreBoard" of the board.
+        """
+        return self.counts[1] - self.counts[2]
+    
+    def hash(self):
+        """
+            @return: - Type: Integer
+                     - Content: The Zobrist hash of the position, the same as "zobristHash" from the point of
+                                view of the player to move.
+        """
+        return self.hashes[self.who] ^ _rotate32(self.hashes[3 - self.who])
+    
+    def ownOpp(self):
+        """
+            @return: - Type: Tuple
+                     - Content: A tuple (own, opp) of the bitboards of the player to move and the opponent.
+        """
+        return self.bits[self.who], self.bits[3 - self.who]
+    
+    def isOver(self):
+        """
+            @return: - Type: Boolean
+                     - Content: True if neither player has a valid move.
+        """
+        return self.validMoves(1) == [] and self.validMoves(2) == []
+    
+    def makeMove(self, move):
+        """
+            Makes a move for the player to move, and then hands the turn to the opponent.
+            Note that it expects a correct move, and does not test against it.
+            
+            @param move: A (row, column) tuple of the move.
+            @return: - Type: Tuple
+                     - Content: The undo record, to take the move back with "unmakeMove".
+        """
+        who = self.who
+        opp = 3 - who
+        flipped = makeMoveUndo(self.board, move, who)
+        added = updateFrontier(self.frontier, self.board, move)
         
-        @return: - Type: void
-                 - Content: N/A
+        # Update the bitboards, counts and hashes with the placed and flipped pieces.
+        sq = move[0]*8 + move[1]
+        flipBits = 0
+        flipHash = 0
+        for r, c in flipped:
+            flipBits |= 1 << (r*8 + c)
+            flipHash ^= ZOBRIST[r*8 + c]
+        self.bits[who] |= flipBits | (1 << sq)
+        self.bits[opp] ^= flipBits
+        self.counts[who] += len(flipped) + 1
+        self.counts[opp] -= len(flipped)
+        self.hashes[who] ^= flipHash ^ ZOBRIST[sq]
+        self.hashes[opp] ^= flipHash
+        
+        undo = (move, flipped, added, self.moves)
+        self.moves = [None, None, None]
+        self.who = opp
+        return undo
+    
+    def passMove(self):
+        """
+            Hands the turn to the opponent without making a move.
+            
+            @return: - Type: Tuple
+                     - Content: The undo record, to take the pass back with "unmakeMove".
+        """
+        self.who = 3 - self.who
+        return (tuple(), [], [], self.moves)
+    
+    def unmakeMove(self, undo):
+        """
+            Takes back the last move or pass.
+            
+            @param undo: The undo record from "makeMove" or "passMove".
+        """
+        move, flipped, added, moves = undo
+        self.who = 3 - self.who
+        self.moves = moves
+        if move == tuple():
+            return
+        
+        who = self.who
+        opp = 3 - who
+        unmakeMove(self.board, move, who, flipped)
+        self.frontier.difference_update(added)
+        
+        sq = move[0]*8 + move[1]
+        self.frontier.add(sq)
+        flipBits = 0
+        flipHash = 0
+        for r, c in flipped:
+            flipBits |= 1 << (r*8 + c)
+            flipHash ^= ZOBRIST[r*8 + c]
+        self.bits[who] ^= flipBits | (1 << sq)
+        self.bits[opp] |= flipBits
+        self.counts[who] -= len(flipped) + 1
+        self.counts[opp] += len(flipped)
+        self.hashes[who] ^= flipHash ^ ZOBRIST[sq]
+        self.hashes[opp] ^= flipHash
+
+# ------------------- Perft --------------------
+# Known perft counts from the starting position, indexed by depth, where a pass counts as a move
+# and a finished game counts as a single leaf.
+PERFT_COUNTS = [1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284, 212258800]
+
+def perftBits(own, opp, depth, bulk = True):
     """
-    # Print welcoming messages.
-    print("*"*55)
-    print("***"+" "*8+"WELCOME TO JOSH'S OTHELLO GAME!"+" "*8+"***")
-    print("*"*55,"\n")
-    print("Enter the players' names, or type 'C' or 'A' or 'L'.\n")
+        Counts the leaf positions of the game tree to a depth, on a pair of bitboards.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param depth: The number of plies to count to, where a pass counts as a ply.
+        @param bulk: If True, count the moves at the last ply instead of making them.
+        @return: - Type: Integer
+                 - Content: The number of leaf positions.
+    """
+    if depth == 0:
+        return 1
+    
+    moves = getMovesBits(own, opp)
+    if moves == 0:
+        # The game is over if neither player can move, so this is a leaf.
+        if getMovesBits(opp, own) == 0:
+            return 1
+        # Otherwise pass.
+        return perftBits(opp, own, depth - 1, bulk)
+    
+    if bulk and depth == 1:
+        return popCount(moves)
+    
+    nodes = 0
+    for sq in bitsToSquares(moves):
+        flips = getFlipsBits(own, opp, sq)
+        nodes += perftBits(opp ^ flips, own | flips | (1 << sq), depth - 1, bulk)
+    return nodes
 
-    # Initilise player 1's name.
-    player1Name = ""
-    # Keep looping until a non-empty string is given as a name for player 1.
-    while player1Name == "":
-        player1Name = input("Please input Player 1's name: ")
-    # Capitilise the first letter of player 1's name.
-    player1Name = player1Name[0].upper() + player1Name[1:]  
+def perft(board, who, depth, bulk = True):
+    """
+        Counts the leaf positions of the game tree to a depth, using "getValidMoves" and "makeMoveUndo"
+        on the board itself, so that it checks those functions.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The player to move, i.e 1 or 2.
+        @param depth: The number of plies to count to, where a pass counts as a ply.
+        @param bulk: If True, count the moves at the last ply instead of making them.
+        @return: - Type: Integer
+                 - Content: The number of leaf positions.
+    """
+    if depth == 0:
+        return 1
     
-    # Check if player 1 name is L, if so load the game.txt file.
-    if player1Name == "L":
-        # Load function.
-        game = loadGame()
-    # Otherwise continue on for a new game.
-    else:
-        # Initilise player 2's name.
-        player2Name = ""
-        # Keep looping until a non-empty string is given as a name for player 2.
-        while player2Name == "":
-            player2Name = input("Please input Player 2's name: ")
-        # Capitilise the first letter of player 2's name.
-        player2Name = player2Name[0].upper() + player2Name[1:]  
+    validMoves = getValidMoves(board, who)
+    if validMoves == []:
+        # The game is over if neither player can move, so this is a leaf.
+        if getValidMoves(board, 3 - who) == []:
+            return 1
+        # Otherwise pass.
+        return perft(board, 3 - who, depth - 1, bulk)
+    
+    if bulk and depth == 1:
+        return len(validMoves)
+    
+    nodes = 0
+    for move in validMoves:
+        flipped = makeMoveUndo(board, move, who)
+        nodes += perft(board, 3 - who, depth - 1, bulk)
+        unmakeMove(board, move, who, flipped)
+    return nodes
+
+def perftSized(own, opp, depth, tables, bulk = True):
+    """
+        The same as "perftBits", on a board of any size.
         
-        # Create a new game.
-        game = newGame(player1Name, player2Name)
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param depth: The number of plies to count to, where a pass counts as a ply.
+        @param tables: The BoardTables of the board size.
+        @param bulk: If True, count the moves at the last ply instead of making them.
+        @return: - Type: Integer
+                 - Content: The number of leaf positions.
+    """
+    if depth == 0:
+        return 1
     
-    # Initlise some variables.
-    player1Comp = bool(False)
-    player2Comp = bool(False)
+    moves = tables.getMoves(own, opp)
+    if moves == 0:
+        if tables.getMoves(opp, own) == 0:
+            return 1
+        return perftSized(opp, own, depth - 1, tables, bulk)
     
-    # Check if either playre is a computer.
-    if game["player1"] == "C" or game["player1"] == "A":
-        player1Comp = True
-    if game["player2"] == "C" or game["player2"] == "A":
-        player2Comp = True
+    if bulk and depth == 1:
+        return popCount(moves)
+    
+    nodes = 0
+    for sq in bitsToSquares(moves):
+        flips = tables.getFlips(own, opp, sq)
+        nodes += perftSized(opp ^ flips, own | flips | (1 << sq), depth - 1, tables, bulk)
+    return nodes
+
+# ------------------- Transposition table --------------------
+# Random numbers for Zobrist hashing, one for each square, grouped by byte so that the hash of a whole
+# bitboard can be found with 8 table lookups. ZOBRIST_BYTES[i][v] is the xor of the numbers for the
+# squares set in byte value "v" of byte "i" of a bitboard.
+_zobristRand = random.Random(20200101)
+ZOBRIST = [_zobristRand.getrandbits(64) for sq in range(64)]
+ZOBRIST_BYTES = []
+for _i in range(8):
+    _table = [0] * 256
+    for _v in range(1, 256):
+        _low = _v & -_v
+        _table[_v] = _table[_v ^ _low] ^ ZOBRIST[_i*8 + _low.bit_length() - 1]
+    ZOBRIST_BYTES.append(_table)
+
+# Bound types of a stored score.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Bytes used by each table entry: key (8), score (4), depth (1), bound (1), move (1), generation (1).
+ENTRY_BYTES = 16
+# Default size of the transposition table in megabytes.
+DEFAULT_TABLE_MB = 16
+
+def zobristBits(bits):
+    """
+        Returns the Zobrist hash of a single bitboard.
         
-    while True:
-        # Print to console current board.
-        printBoard(game["board"])
-        #Check which persons turn it is.
-        if game["who"] == 1:
-            # Check if player is a computer or human.
-            if player1Comp:
-                print("Comp 1 is thinking...")
-                # Get valid moves with current board.
-                validMoves = getValidMoves(game["board"], game["who"])
-                # Check which computer algorithm to use to determine move.
-                if game["player1"] == "C":
-                    bestMove = suggestMove1(game["board"], game["who"])
-                elif game["player1"] == "A":
-                    bestMove = suggestMove2(game["board"], game["who"])
-                # Check for an empty tuple move bestMove, as player may not have any valid moves.
-                if bestMove != tuple():
-                    # Make the suggested move on the current board.
-                    makeMove(game["board"], bestMove, game["who"])
-                    print("Comp 1 chose to go", indexToStr(bestMove))
-                else: print("Comp 1 skipping go, no valid moves.")
-            else:
-                # Get valid moves with current board.
-                validMoves = getValidMoves(game["board"], game["who"])
-                # Convert valid moves into a string for outputting to player.
-                strValidMoves = [indexToStr(x) for x in validMoves]
-                # Loop until a valid move is given.
-                while True:   
-                    print("Valid moves are: ", strValidMoves)
-                    # Get a input from player.
-                    move = input("Please enter a valid move: ")
-                    # Check for validity of move.
-                    if move != "" and ((move in strValidMoves) or (move in [x[::-1] for x in strValidMoves])):
-                        # Convert string to a tuple move.
-                        move = strToIndex(move)
-                        break
-                    else:
-                        print("You inputted: ", move)
-                        print("Not valid move, try again.")
-                # Make the move.
-                makeMove(game["board"], move, game["who"])
-        elif game["who"] == 2:
-            if player2Comp:
-                print("Comp 2 is thinking...")
-                # Get valid moves with current board.
-                validMoves = getValidMoves(game["board"], game["who"])
-                # Check which computer algorithm to use to determine move.
-                if game["player2"] == "C":
-                    bestMove = suggestMove1(game["board"], game["who"])
-                elif game["player2"] == "A":
-                    bestMove = suggestMove2(game["board"], game["who"])
-                # Check for an empty tuple move bestMove, as player may not have any valid moves.
-                if bestMove != tuple():
-                    # Make the suggested move on the current board.
-                    makeMove(game["board"], bestMove, game["who"])
-                    print("Comp 2 chose to go", indexToStr(bestMove))
-                else: print("Comp 2 skipping go, no valid moves.")
-            else:
-                # Get valid moves with current board.
-                validMoves = getValidMoves(game["board"], game["who"])
-                # Convert valid moves into a string for outputting to player.
-                strValidMoves = [indexToStr(x) for x in validMoves]
-                # Loop until a valid move is given.
-                while True:   
-                    print("Valid moves are: ", strValidMoves)
-                    # Get a input from player.
-                    move = input("Please enter a valid move: ")
-                    # Check for validity of move.
-                    if move != "" and ((move in strValidMoves) or (move in [x[::-1] for x in strValidMoves])):
-                        # Convert string to a tuple move.
-                        move = strToIndex(move)
-                        break
-                    else:
-                        print("You inputted: ", move)
-                        print("Not valid move, try again.")
-                # Make the move.
-                makeMove(game["board"], move, game["who"])
-        
-        # Altenate between the current player who variable.
-        game["who"] = [x for x in [1,2] if x != game["who"]][0] 
-        
-        # Check if both players have no valid moves, if so then game has ended.
-        if (getValidMoves(game["board"], 1) == []) and (getValidMoves(game["board"], 2) == []):
-            # Print final board.
-            printBoard(game["board"])
-            score = scoreBoard(game["board"])
-            print("The end score is:", score)
-            if score > 0:
-                print("Player 1 has won.")
-            elif score < 0:
-                print("Player 2 has won.")
-            elif score == 0:
-                print("Draw")
-            return
+        @param bits: A bitboard integer.
+        @return: - Type: Integer
+                 - Content: The 64-bit xor of the random numbers of every set square.
+    """
+    z = ZOBRIST_BYTES
+    return (z[0][bits & 255] ^ z[1][(bits >> 8) & 255] ^ z[2][(bits >> 16) & 255] ^ z[3][(bits >> 24) & 255] ^
+            z[4][(bits >> 32) & 255] ^ z[5][(bits >> 40) & 255] ^ z[6][(bits >> 48) & 255] ^ z[7][bits >> 56])
+
+def zobristHash(own, opp):
+    """
+        Returns the Zobrist hash of a position, from the point of view of the player to move.
+        The opponent's hash is rotated by 32 bits, so the same pieces hash differently for each side.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @return: - Type: Integer
+                 - Content: The 64-bit hash of the position.
+    """
+    oppHash = zobristBits(opp)
+    return zobristBits(own) ^ (((oppHash << 32) | (oppHash >> 32)) & FULL_MASK)
+
+class TransTable:
+    """
+        A fixed size transposition table, storing the depth, bound type, score and best move of searched positions.
+        Entries are held in flat arrays so the memory used never grows past the size it was made with.
+        Each bucket has 2 slots: the first is kept for the deepest search, and the second is always replaced.
+    """
+    
+    def __init__(self, megabytes = DEFAULT_TABLE_MB):
+        """
+            @param megabytes: The maximum memory the table may use in megabytes.
+            @throws: - ValueError: If the table would have no room for a single bucket.
+        """
+        self.buckets = int(megabytes * 1024 * 1024) // (2 * ENTRY_BYTES)
+        if self.buckets < 1: raise ValueError(megabytes)
+        slots = 2 * self.buckets
+        self.keys = array("Q", [0]) * slots
+        self.scores = array("i", [0]) * slots
+        self.depths = array("b", [-1]) * slots
+        self.bounds = array("B", [0]) * slots
+        self.moves = array("b", [0]) * slots
+        self.gens = array("B", [0]) * slots
+        self.generation = 0
+        # Set by "startPonder", whose generation the next real search carries on, instead of starting its own.
+        self.pondered = False
+    
+    def newSearch(self):
+        """
+            Starts a new search generation, so entries from earlier moves can be replaced before newer ones.
+        """
+        self.generation = (self.generation + 1) & 255
+    
+    def moveSearch(self):
+        """
+            Starts the generation of a real move's search, unless pondering already started it, so that
+            the entries stored while pondering are not the first to be replaced.
+        """
+        if self.pondered:
+            self.pondered = False
+        else:
+            self.newSearch()
+    
+    def clear(self):
+        """
+            Empties the table, e.g: at the start of a new game.
+        """
+        slots = len(self.keys)
+        # Let go of the old arrays before making the new ones, so the memory is never held twice.
+        self.keys = self.depths = None
+        self.keys = array("Q", [0]) * slots
+        self.depths = array("b", [-1]) * slots
+    
+    def probe(self, key):
+        """
+            Looks up a position in the table.
+            
+            @param key: The Zobrist hash of the position.
+            @return: - Type: Tuple
+                     - Content: A tuple (depth, bound, score, move) of the stored entry, or None if the
+                                position is not in the table.
+        """
+        i = (key % self.buckets) << 1
+        if self.keys[i] != key or self.depths[i] < 0:
+            i += 1
+            if self.keys[i] != key or self.depths[i] < 0:
+                return None
+        return self.depths[i], self.bounds[i], self.scores[i], self.moves[i]
+    
+    def store(self, key, depth, bound, score, move):
+        """
+            Stores a position in the table.
+            
+            @param key: The Zobrist hash of the position.
+            @param depth: The depth the position was searched to.
+            @param bound: Whether the score is EXACT, a LOWER bound or an UPPER bound.
+            @param score: The score of the position.
+            @param move: The square index of the best move, or -1 for none.
+        """
+        i = (key % self.buckets) << 1
+        # Use the depth-preferred slot if it holds the same position, a shallower search,
+        # or a search from an earlier move. Otherwise use the always-replace slot.
+        if self.keys[i] != key and depth < self.depths[i] and self.gens[i] == self.generation:
+            i += 1
+        elif self.keys[i] != key and self.depths[i] >= 0:
+            # Move the old entry into the always-replace slot rather than lose it.
+            j = i + 1
+            self.keys[j] = self.keys[i]
+            self.depths[j] = self.depths[i]
+            self.bounds[j] = self.bounds[i]
+            self.scores[j] = self.scores[i]
+            self.moves[j] = self.moves[i]
+            self.gens[j] = self.gens[i]
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.scores[i] = score
+        self.moves[i] = move
+        self.gens[i] = self.generation
+
+# The process wide transposition table, made when it is first needed so that it lasts between moves.
+_transTable = None
+
+def setTransTable(megabytes):
+    """
+        Replaces the process wide transposition table with a new empty one of the given size.
+        
+        @param megabytes: The maximum memory the table may use in megabytes, e.g: 64 per worker process.
+        @return: - Type: TransTable
+                 - Content: The new table.
+    """
+    global _transTable
+    _transTable = TransTable(megabytes)
+    return _transTable
+
+def getTransTable():
+    """
+        Returns the process wide transposition table, making one of the default size if there is none yet.
+        
+        @return: - Type: TransTable
+                 - Content: The table shared by every search in this process.
+    """
+    if _transTable is None:
+        return setTransTable(DEFAULT_TABLE_MB)
+    return _transTable
+
+# ------------------- Symmetry --------------------
+# Every position has up to 8 symmetric copies (rotations and reflections) which play the same. Mapping each
+# one to a canonical copy lets caches and books hold a single entry for all of them. Symmetries are numbered
+# 0 - 7, where bit 0 mirrors the columns, bit 1 flips the rows, and bit 2 then swaps rows and columns.
+
+# Each byte value with its bits reversed, so that mirroring every row of a bitboard is one "bytes.translate".
+_REVERSE_BITS = bytes(int("{:08b}".format(v)[::-1], 2) for v in range(256))
+
+def flipRows(bits):
+    """
+        Flips a bitboard upside down, i.e row r becomes row 7 - r, by reversing its bytes.
+    """
+    return int.from_bytes(bits.to_bytes(8, "little"), "big")
+
+def mirrorColumns(bits):
+    """
+        Mirrors a bitboard left to right, i.e column c becomes column 7 - c, by reversing the bits of each byte.
+    """
+    return int.from_bytes(bits.to_bytes(8, "little").translate(_REVERSE_BITS), "little")
+
+def transposeBits(bits):
+    """
+        Swaps the rows and columns of a bitboard, i.e (r, c) becomes (c, r), with 3 delta swaps.
+        The masks cover 2 bitboards, so a pair packed as (own << 64 | opp) can be transposed at once.
+    """
+    t = 0x0f0f0f0f000000000f0f0f0f00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x33330000333300003333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x55005500550055005500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits
+
+def symmetryBits(bits, sym):
+    """
+        Returns the symmetric copy of a bitboard.
+        
+        @param bits: A bitboard.
+        @param sym: The symmetry number, 0 - 7.
+        @return: - Type: Integer
+                 - Content: The transformed bitboard.
+    """
+    if sym & 1:
+        bits = mirrorColumns(bits)
+    if sym & 2:
+        bits = flipRows(bits)
+    if sym & 4:
+        bits = transposeBits(bits)
+    return bits
+
+# SYMMETRY_SQUARES[sym][sq] is the square that "sq" becomes under the symmetry.
+SYMMETRY_SQUARES = tuple(tuple(symmetryBits(1 << sq, sym).bit_length() - 1 for sq in range(64)) for sym in range(8))
+# The symmetry that undoes each symmetry.
+SYMMETRY_INVERSE = tuple(next(inv for inv in range(8) if SYMMETRY_SQUARES[inv][SYMMETRY_SQUARES[sym][9]] == 9
+                              and SYMMETRY_SQUARES[inv][SYMMETRY_SQUARES[sym][2]] == 2)
+                         for sym in range(8))
+
+def canonicalBits(own, opp):
+    """
+        Returns the canonical copy of a position, the symmetric copy with the smallest (own, opp) pair.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @return: - Type: Tuple
+                 - Content: A tuple (own, opp, sym) of the canonical bitboards and the symmetry which made them.
+                            Moves found on the canonical copy map back with SYMMETRY_SQUARES[SYMMETRY_INVERSE[sym]].
+    """
+    # Pack the pair into one integer, so each copy is made and compared in one go. As bytes it is the 8 rows
+    # of "opp" followed by the 8 rows of "own".
+    raw = (own << 64 | opp).to_bytes(16, "little")
+    mirrored = raw.translate(_REVERSE_BITS)
+    # Build the 4 copies without swapping rows and columns, and then swap each of them.
+    copies = [int.from_bytes(b, "little") for b in (raw, mirrored, raw[7::-1] + raw[:7:-1],
+                                                    mirrored[7::-1] + mirrored[:7:-1])]
+    copies += [transposeBits(pair) for pair in copies]
+    pair = min(copies)
+    return pair >> 64, pair & FULL_MASK, copies.index(pair)
+
+def canonicalHash(own, opp):
+    """
+        Returns the Zobrist hash of the canonical copy of a position, which every symmetric copy shares.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @return: - Type: Tuple
+                 - Content: A tuple (hash, sym) of the hash and the symmetry from "canonicalBits".
+    """
+    own, opp, sym = canonicalBits(own, opp)
+    return zobristHash(own, opp), sym
+
+# ------------------- Opening book --------------------
+# An opening book file is the header: BOOK_MAGIC then the number of records as a little-endian uint32,
+# followed by fixed size records of (position hash, score, move square) sorted by hash. A position has one
+# record for each of its scored moves, where the score is from the point of view of the player to move.
+# Positions are stored as their canonical copy, from "canonicalHash", with the moves on that copy, so all
+# symmetric copies of a position share one set of records.
+BOOK_MAGIC = b"OTHBOOK2"
+BOOK_HEADER = struct.Struct("<8sI")
+BOOK_RECORD = struct.Struct("<QiB")
+
+class OpeningBook:
+    """
+        A read-only opening book, opened through mmap so that every process using the same file shares
+        one page cached copy of it. Lookups are a binary search on the sorted records.
+    """
+    
+    def __init__(self, path):
+        """
+            @param path: The path of the book file.
+            @throws: - ValueError: If the file is not an opening book.
+        """
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, self.count = BOOK_HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or len(self.data) != BOOK_HEADER.size + self.count * BOOK_RECORD.size:
+            self.close()
+            raise ValueError(path)
+    
+    def close(self):
+        """
+            Closes the book file.
+        """
+        self.data.close()
+        self.file.close()
+    
+    def lookup(self, key):
+        """
+            Finds every scored move of a position.
+            
+            @param key: The canonical hash of the position, from "canonicalHash".
+            @return: - Type: List of tuples
+                     - Content: A list of (square, score) tuples, best score first, or an empty list if the
+                                position is not in the book.
+        """
+        data = self.data
+        size = BOOK_RECORD.size
+        start = BOOK_HEADER.size
+        
+        # Find the first record with the key.
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if BOOK_RECORD.unpack_from(data, start + mid * size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        
+        # Read every record with the key.
+        entries = list()
+        while lo < self.count:
+            recKey, score, sq = BOOK_RECORD.unpack_from(data, start + lo * size)
+            if recKey != key:
+                break
+            entries.append((sq, score))
+            lo += 1
+        entries.sort(key = lambda entry: -entry[1])
+        return entries
+
+def writeBook(path, book):
+    """
+        Writes an opening book file.
+        
+        @param path: The path of the book file to write.
+        @param book: A dictionary mapping each canonical position hash to a dictionary of {square: score},
+                     with the squares on the canonical copy.
+        @return: - Type: Integer
+                 - Content: The number of records written.
+    """
+    records = sorted((key, score, sq) for key, moves in book.items() for sq, score in moves.items())
+    with open(path, "wb") as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, len(records)))
+        for record in records:
+            f.write(BOOK_RECORD.pack(*record))
+    return len(records)
+
+# The process wide opening book, or None if no book has been set.
+_openingBook = None
+
+def setBook(path):
+    """
+        Opens an opening book for every AI in this process to use, replacing any book already open.
+        
+        @param path: The path of the book file, or None to stop using a book.
+        @return: - Type: OpeningBook
+                 - Content: The opened book, or None.
+    """
+    global _openingBook
+    if _openingBook is not None:
+        _openingBook.close()
+    _openingBook = OpeningBook(path) if path is not None else None
+    return _openingBook
+
+def bookMove(own, opp):
+    """
+        Returns the best book move of a position, if the position is in the process wide opening book.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @return: - Type: Integer
+                 - Content: The square index of the best valid book move, or -1 if there is none.
+    """
+    if _openingBook is None:
+        return -1
+    moves = getMovesBits(own, opp)
+    key, sym = canonicalHash(own, opp)
+    toBoard = SYMMETRY_SQUARES[SYMMETRY_INVERSE[sym]]
+    for sq, score in _openingBook.lookup(key):
+        # Map the move back from the canonical copy, and check it is valid, in case of a hash collision.
+        sq = toBoard[sq]
+        if moves >> sq & 1:
+            return sq
+    return -1
+
+# ------------------- Pattern evaluation --------------------
+# A Logistello style evaluation, which scores the board as the sum of the weights of the patterns of pieces
+# on fixed groups of squares. Each group is read as a base 3 index (0 empty, 1 player 1, 2 player 2) into a
+# weight table shared by every symmetric copy of the group. A group that is its own mirror image, such as an
+# edge, looks its weight up by the smaller of its index and its mirrored index, so that the evaluation is the
+# same for every symmetric copy of a board. Scores are from player 1's point of view, in hundredths of a disc.
+
+# The 8 symmetries of the board, as functions of (row, column).
+SYMMETRIES = (lambda r, c: (r, c), lambda r, c: (c, 7 - r), lambda r, c: (7 - r, 7 - c), lambda r, c: (7 - c, r),
+              lambda r, c: (r, 7 - c), lambda r, c: (7 - r, c), lambda r, c: (c, r), lambda r, c: (7 - c, 7 - r))
+
+# The base shape of each pattern type, as a list of (row, column) squares.
+PATTERN_SHAPES = (
+    ("edge2x", [(0, c) for c in range(8)] + [(1, 1), (1, 6)]),
+    ("corner3x3", [(r, c) for r in range(3) for c in range(3)]),
+    ("corner2x5", [(r, c) for r in range(2) for c in range(5)]),
+    ("hv2", [(1, c) for c in range(8)]),
+    ("hv3", [(2, c) for c in range(8)]),
+    ("hv4", [(3, c) for c in range(8)]),
+    ("diag8", [(i, i) for i in range(8)]),
+    ("diag7", [(i, i + 1) for i in range(7)]),
+    ("diag6", [(i, i + 2) for i in range(6)]),
+    ("diag5", [(i, i + 3) for i in range(5)]),
+    ("diag4", [(i, i + 4) for i in range(4)]),
+    )
+
+def _patternInstances():
+    """
+        Returns every distinct symmetric copy of every pattern shape.
+        
+        @return: - Type: Tuple
+                 - Content: A tuple (types, instances), where instances[i] is a tuple of the square indexes of
+                            copy i, in the same order as its base shape, and types[i] is its pattern type.
+    """
+    types = list()
+    instances = list()
+    for t, (name, shape) in enumerate(PATTERN_SHAPES):
+        seen = set()
+        for sym in SYMMETRIES:
+            squares = tuple(r*8 + c for r, c in (sym(r, c) for r, c in shape))
+            if frozenset(squares) not in seen:
+                seen.add(frozenset(squares))
+                types.append(t)
+                instances.append(squares)
+    return tuple(types), tuple(instances)
+
+PATTERN_TYPES, PATTERN_INSTANCES = _patternInstances()
+# The number of weights of each pattern type.
+PATTERN_SIZES = tuple(3 ** len(shape) for name, shape in PATTERN_SHAPES)
+# For each square, the (instance, power of 3) pairs of every pattern copy it is part of.
+SQUARE_PATTERNS = tuple(
+    tuple((i, 3 ** squares.index(sq)) for i, squares in enumerate(PATTERN_INSTANCES) if sq in squares)
+    for sq in range(64))
+
+def _patternCanonical(shape):
+    """
+        Returns the table that maps each index of a pattern shape to the smallest index of the same pieces read
+        under any symmetry that maps the shape onto itself.
+        
+        @param shape: A list of (row, column) squares from PATTERN_SHAPES.
+        @return: - Type: Array
+                 - Content: The canonical index of each of the 3 ** len(shape) indexes.
+    """
+    # Each symmetry of the shape moves the piece at position k of the shape to position perm[k].
+    perms = set()
+    for sym in SYMMETRIES:
+        mapped = [sym(r, c) for r, c in shape]
+        if set(mapped) == set(shape):
+            perms.add(tuple(shape.index(square) for square in mapped))
+    canonical = array("i", range(3 ** len(shape)))
+    for perm in perms:
+        # Build the mirrored index of every index a digit at a time, from the least significant.
+        mirrored = [0]
+        for k in range(len(shape)):
+            power = 3 ** perm[k]
+            mirrored = mirrored + [m + power for m in mirrored] + [m + 2*power for m in mirrored]
+        canonical = array("i", map(min, canonical, mirrored))
+    return canonical
+
+# For each pattern type, and for each pattern copy in PATTERN_INSTANCES order, the canonical index table.
+PATTERN_CANONICAL = tuple(_patternCanonical(shape) for name, shape in PATTERN_SHAPES)
+INSTANCE_CANONICAL = tuple(PATTERN_CANONICAL[t] for t in PATTERN_TYPES)
+
+PATTERN_MAGIC = b"OTHPAT01"
+
+def patternIndexes(p1Bits, p2Bits):
+    """
+        Works out the index of every pattern copy of a board from scratch.
+        
+        @param p1Bits: Bitboard of player 1's pieces.
+        @param p2Bits: Bitboard of player 2's pieces.
+        @return: - Type: List of integers
+                 - Content: The base 3 index of each copy in PATTERN_INSTANCES.
+    """
+    indexes = [0] * len(PATTERN_INSTANCES)
+    for who, bits in ((1, p1Bits), (2, p2Bits)):
+        for sq in bitsToSquares(bits):
+            for i, power in SQUARE_PATTERNS[sq]:
+                indexes[i] += who * power
+    return indexes
+
+def canonicalPatternIndexes(indexes):
+    """
+        Maps pattern indexes to the indexes their weights are looked up by, as in "evaluatePatterns".
+        
+        @param indexes: The pattern indexes from "patternIndexes".
+        @return: - Type: List of integers
+                 - Content: The canonical index of each copy in PATTERN_INSTANCES.
+    """
+    return [canonical[index] for canonical, index in zip(INSTANCE_CANONICAL, indexes)]
+
+def patternMove(indexes, who, sq, flips, undo = False):
+    """
+        Updates pattern indexes in place for a move, changing only the copies that hold the placed
+        or flipped pieces.
+        
+        @param indexes: The pattern indexes from "patternIndexes", before the move.
+        @param who: The player making the move, i.e 1 or 2.
+        @param sq: The square index of the move.
+        @param flips: Bitboard of the flipped pieces.
+        @param undo: If True, take the move back instead.
+    """
+    # The placed piece goes from 0 to "who", and each flipped piece from the opponent to "who".
+    place = -who if undo else who
+    flip = (who - (3 - who)) * (-1 if undo else 1)
+    for i, power in SQUARE_PATTERNS[sq]:
+        indexes[i] += place * power
+    for f in bitsToSquares(flips):
+        for i, power in SQUARE_PATTERNS[f]:
+            indexes[i] += flip * power
+
+def patternStage(discs, stages):
+    """
+        @return: - Type: Integer
+                 - Content: The game stage of a board with "discs" pieces on it, from 0 to stages-1.
+    """
+    return min(stages - 1, (discs - 4) * stages // 61)
+
+def evaluatePatterns(indexes, discs, weights = None):
+    """
+        Scores a board by looking up the weight of every pattern copy.
+        
+        @param indexes: The pattern indexes of the board.
+        @param discs: The number of pieces on the board, which picks the game stage.
+        @param weights: Weights from "loadPatternWeights", or None for the process wide weights.
+        @return: - Type: Integer
+                 - Content: The score from player 1's point of view, in hundredths of a disc.
+    """
+    if weights is None:
+        weights = _patternWeights
+    tables = weights[patternStage(discs, len(weights))]
+    score = 0
+    for t, canonical, index in zip(PATTERN_TYPES, INSTANCE_CANONICAL, indexes):
+        score += tables[t][canonical[index]]
+    return score
+
+def loadPatternWeights(path):
+    """
+        Loads pattern weights from a file: PATTERN_MAGIC, the number of stages as 1 byte, and then for each
+        stage the weight table of each pattern type, in PATTERN_SHAPES order, as little-endian int16s.
+        
+        @param path: The path of the weight file.
+        @return: - Type: List
+                 - Content: For each stage, a list of the weight array of each pattern type.
+        @throws: - ValueError: If the file is not a weight file.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(PATTERN_MAGIC)) != PATTERN_MAGIC: raise ValueError(path)
+        stages = f.read(1)[0]
+        weights = list()
+        for stage in range(stages):
+            tables = list()
+            for size in PATTERN_SIZES:
+                table = array("h")
+                table.fromfile(f, size)
+                if sys.byteorder != "little":
+                    table.byteswap()
+                tables.append(table)
+            weights.append(tables)
+        if f.read(1) != b"": raise ValueError(path)
+    return weights
+
+def writePatternWeights(path, weights):
+    """
+        Writes pattern weights to a file, in the format read by "loadPatternWeights".
+        
+        @param path: The path of the weight file.
+        @param weights: For each stage, a list of the weights of each pattern type, as sequences of integers
+                        between -32768 and 32767.
+    """
+    with open(path, "wb") as f:
+        f.write(PATTERN_MAGIC)
+        f.write(bytes([len(weights)]))
+        for tables in weights:
+            for size, table in zip(PATTERN_SIZES, tables):
+                table = array("h", table)
+                if len(table) != size: raise ValueError(len(table))
+                if sys.byteorder != "little":
+                    table.byteswap()
+                table.tofile(f)
+
+# The process wide pattern weights, or None to use the square weight evaluation, and the file they came from.
+_patternWeights = None
+_patternWeightsPath = None
+
+def setPatternWeights(path):
+    """
+        Loads pattern weights for every search in this process to evaluate with.
+        
+        @param path: The path of the weight file, or None to go back to the square weight evaluation.
+        @return: - Type: List
+                 - Content: The loaded weights, or None.
+    """
+    global _patternWeights, _patternWeightsPath
+    _patternWeights = loadPatternWeights(path) if path is not None else None
+    _patternWeightsPath = path
+    # Scores in the transposition table came from the old evaluation.
+    if _transTable is not None:
+        _transTable.clear()
+    return _patternWeights
+
+def getPatternWeights():
+    """
+        @return: - Type: List
+                 - Content: The pattern weights every search in this process evaluates with, or None if
+                            the square weight evaluation is used.
+    """
+    return _patternWeights
+
+# ------------------- Search AI --------------------
+# Static weight of each square, indexed by row*8 + col, used for evaluation and move ordering.
+SQUARE_WEIGHTS = [
+    100, -20,  10,   5,   5,  10, -20, 100,
+    -20, -50,  -2,  -2,  -2,  -2, -50, -20,
+     10,  -2,  -1,  -1,  -1,  -1,  -2,  10,
+      5,  -2,  -1,  -1,  -1,  -1,  -2,   5,
+      5,  -2,  -1,  -1,  -1,  -1,  -2,   5,
+     10,  -2,  -1,  -1,  -1,  -1,  -2,  10,
+    -20, -50,  -2,  -2,  -2,  -2, -50, -20,
+    100, -20,  10,   5,   5,  10, -20, 100
+    ]
+
+# The same weights grouped into (weight, mask) pairs, so a whole bitboard can be weighted with a few popcounts.
+WEIGHT_MASKS = tuple(
+    (w, sum(1 << sq for sq in range(64) if SQUARE_WEIGHTS[sq] == w))
+    for w in sorted(set(SQUARE_WEIGHTS))
+    )
+
+# Score given to a finished game per piece of difference, so that wins always outweigh any evaluation.
+WIN_SCORE = 10000
+# Larger than any score the search can return, including the largest pattern evaluation.
+INFINITY = 1 << 30
+
+class SearchTimeout(Exception):
+    """
+        Raised inside the search when its time budget has run out.
+    """
+    pass
+
+def evaluateBits(own, opp):
+    """
+        Returns a heuristic score of a position from the point of view of the player owning "own".
+        
+        @param own: Bitboard of the current player's pieces.
+        @param opp: Bitboard of the opponent's pieces.
+        @return: - Type: Integer
+                 - Content: The score, where a positive number is good for the current player.
+    """
+    # Square weights.
+    score = 0
+    for w, mask in WEIGHT_MASKS:
+        score += w * (popCount(own & mask) - popCount(opp & mask))
+    
+    # Mobility.
+    score += 5 * (popCount(getMovesBits(own, opp)) - popCount(getMovesBits(opp, own)))
+    
+    return score
+
+def orderMoves(moves, first = -1):
+    """
+        Returns the squares of a move bitboard, sorted so the most promising moves are searched first.
+        
+        @param moves: A bitboard of valid moves.
+        @param first: The square index of a move to always place first, or -1 for none.
+        @return: - Type: List of integers
+                 - Content: The square indexes of the moves.
+    """
+    order = sorted(bitsToSquares(moves), key = SQUARE_WEIGHTS.__getitem__, reverse = True)
+    if first in order:
+        order.remove(first)
+        order.insert(0, first)
+    return order
+
+def negamax(own, opp, depth, alpha, beta, search, patterns = None):
+    """
+        Negamax search with alpha-beta pruning on a pair of bitboards.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param depth: The number of plies left to search.
+        @param alpha: The lower bound of the search window.
+        @param beta: The upper bound of the search window.
+        @param search: The search dictionary, with fields "deadline", "nodes" and "table".
+        @param patterns: A tuple (indexes, who) of the pattern indexes of the position and the player to move,
+                         to evaluate with the process wide pattern weights, or None to use "evaluateBits".
+                         The indexes are updated in place as moves are made and taken back, so they are
+                         left part way through a move if the search times out.
+        @return: - Type: Integer
+                 - Content: The score of the position from the point of view of the player to move.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    # Check the clock every so often, so the time budget is kept.
+    search["nodes"] += 1
+    if search["nodes"] & 63 == 0 and time.perf_counter() > search["deadline"]:
+        raise SearchTimeout
+    
+    moves = getMovesBits(own, opp)
+    
+    # Check for a player with no moves.
+    if moves == 0:
+        # If neither player can move then the game is over, so score the final position.
+        if getMovesBits(opp, own) == 0:
+            return WIN_SCORE * (popCount(own) - popCount(opp))
+        # Otherwise the player has to pass.
+        if patterns is not None:
+            patterns = (patterns[0], 3 - patterns[1])
+        return -negamax(opp, own, depth, -beta, -alpha, search, patterns)
+    
+    if depth == 0:
+        if patterns is not None:
+            score = evaluatePatterns(patterns[0], popCount(own | opp))
+            return score if patterns[1] == 1 else -score
+        return evaluateBits(own, opp)
+    
+    # Check the transposition table for a usable score, or at least a best move to search first.
+    table = search["table"]
+    ttMove = -1
+    if table is not None:
+        key = zobristHash(own, opp)
+        entry = table.probe(key)
+        if entry is not None:
+            ttDepth, bound, score, ttMove = entry
+            if ttDepth >= depth:
+                if bound == EXACT:
+                    return score
+                elif bound == LOWER and score > alpha:
+                    alpha = score
+                elif bound == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score
+    
+    alphaOrig = alpha
+    best = -INFINITY
+    bestSq = -1
+    # The children share this node's index list, which is updated in place for each move and then put back.
+    childPatterns = (patterns[0], 3 - patterns[1]) if patterns is not None else None
+    for sq in orderMoves(moves, ttMove):
+        flips = getFlipsBits(own, opp, sq)
+        if patterns is not None:
+            patternMove(patterns[0], patterns[1], sq, flips)
+        score = -negamax(opp ^ flips, own | flips | (1 << sq), depth - 1, -beta, -alpha, search, childPatterns)
+        if patterns is not None:
+            patternMove(patterns[0], patterns[1], sq, flips, True)
+        if score > best:
+            best = score
+            bestSq = sq
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    
+    # Store the result, noting whether it is only a bound due to a cut-off.
+    if table is not None:
+        if best <= alphaOrig:
+            table.store(key, depth, UPPER, best, bestSq)
+        elif best >= beta:
+            table.store(key, depth, LOWER, best, bestSq)
+        else:
+            table.store(key, depth, EXACT, best, bestSq)
+    
+    return best
+
+def searchRoot(own, opp, depth, search, first = -1, patterns = None):
+    """
+        Searches every move from the root position to a fixed depth.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param depth: The number of plies to search.
+        @param search: The search dictionary, with fields "deadline", "nodes" and "table". The best move
+                       found so far, and its score, are kept in the fields "move" and "score" even if the
+                       search times out.
+        @param first: The square index of a move to search first, or -1 for none.
+        @param patterns: A tuple (indexes, who) for pattern evaluation, as in "negamax", or None.
+        @return: - Type: Tuple
+                 - Content: A tuple (square, score) of the best move and its score.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    alpha = -INFINITY
+    bestSq = -1
+    childPatterns = (patterns[0], 3 - patterns[1]) if patterns is not None else None
+    for sq in orderMoves(getMovesBits(own, opp), first):
+        flips = getFlipsBits(own, opp, sq)
+        if patterns is not None:
+            patternMove(patterns[0], patterns[1], sq, flips)
+        score = -negamax(opp ^ flips, own | flips | (1 << sq), depth - 1, -INFINITY, -alpha, search, childPatterns)
+        if patterns is not None:
+            patternMove(patterns[0], patterns[1], sq, flips, True)
+        if score > alpha:
+            alpha = score
+            bestSq = sq
+            search["move"] = sq
+            search["score"] = score
+    
+    if search["table"] is not None:
+        search["table"].store(zobristHash(own, opp), depth, EXACT, alpha, bestSq)
+    return bestSq, alpha
+
+def searchPatterns(own, opp, who):
+    """
+        Returns the pattern state for the root of a search, if pattern weights have been loaded.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param who: The player to move, i.e 1 or 2.
+        @return: - Type: Tuple
+                 - Content: A tuple (indexes, who) to pass to "searchRoot", or None to use "evaluateBits".
+    """
+    if _patternWeights is None:
+        return None
+    p1Bits, p2Bits = (own, opp) if who == 1 else (opp, own)
+    return patternIndexes(p1Bits, p2Bits), who
+
+def suggestMove3(board, who, time_ms = 1000, depth = None, table = None, endgame = None, position = None):
+    """
+        Returns a tuple of a "ideal" position on the board for "who" to place there piece.
+        This algorithm uses a negamax search with alpha-beta pruning, iteratively deepening until either
+        "depth" is reached or the time budget runs out, in which case the best move found so far is used.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The current players value, i.e 1 or 2.
+        @param time_ms: The time budget of the search in milliseconds.
+        @param depth: The maximum depth in plies to search to, or None to search until the end of the game.
+        @param table: The TransTable to use, or None to use the process wide table, which is kept between moves.
+        @param endgame: The number of empty squares at or below which the game is first tried to be solved
+                        exactly, or None for ENDGAME_EMPTIES. The solver gets half of the time budget,
+                        and the normal search is used if it runs out.
+        @param position: A Position of "board" with "who" to move, to take the bitboards from, or None.
+        @return: - Type: Tuple
+                 - Content: A (row, column) tuple position on the "board", or an empty tuple if there
+                            are no valid moves.
+    """
+    own, opp = position.ownOpp() if position is not None else splitBits(board, who)
+    moves = getMovesBits(own, opp)
+    
+    # Check for no valid moves, or only a single one to make.
+    if moves == 0:
+        return tuple()
+    if moves & (moves - 1) == 0:
+        return divmod(moves.bit_length() - 1, 8)
+    
+    # Play the book move if there is one.
+    bookSq = bookMove(own, opp)
+    if bookSq != -1:
+        return divmod(bookSq, 8)
+    
+    # Never search deeper than the number of empty squares.
+    empties = 64 - popCount(own | opp)
+    if depth is None or depth > empties:
+        depth = empties
+    
+    # Fall back on the first ordered move, in case not even one move can be searched in time.
+    bestSq = orderMoves(moves)[0]
+    if table is None:
+        table = getTransTable()
+    table.moveSearch()
+    search = {"deadline": time.perf_counter() + time_ms / 1000, "nodes": 0, "move": -1, "score": -INFINITY,
+              "table": table}
+    
+    # Try to solve the game exactly in half the time, and if that runs out the normal search has the rest.
+    if endgame is None:
+        endgame = ENDGAME_EMPTIES
+    if empties <= endgame:
+        deadline = search["deadline"]
+        search["deadline"] = time.perf_counter() + time_ms / 2000
+        try:
+            return divmod(solveRoot(own, opp, search)[0], 8)
+        except SearchTimeout:
+            search["deadline"] = deadline
+    
+    # Evaluate with the pattern weights if they have been loaded.
+    patterns = searchPatterns(own, opp, who)
+    
+    # Iteratively deepen the search, searching the previous best move first each time.
+    try:
+        for d in range(1, depth + 1):
+            search["move"] = -1
+            bestSq, score = searchRoot(own, opp, d, search, bestSq, patterns)
+    except SearchTimeout:
+        # A partly searched iteration always searches the previous best move first, so any move
+        # it found to be better can be trusted.
+        if search["move"] != -1:
+            bestSq = search["move"]
+    
+    return divmod(bestSq, 8)
+
+# ------------------- Endgame solver --------------------
+# Default number of empty squares at or below which "suggestMove3" tries to solve the game exactly.
+ENDGAME_EMPTIES = 12
+# Above this many empty squares moves are ordered fastest-first, below it by parity alone.
+FASTEST_FIRST_EMPTIES = 7
+
+# Masks of the 4 quadrants of the board, used for parity ordering.
+QUADRANT_MASKS = (0x000000000f0f0f0f, 0x00000000f0f0f0f0, 0x0f0f0f0f00000000, 0xf0f0f0f000000000)
+# The quadrant of each square, indexed by row*8 + col.
+SQUARE_QUADRANT = [(sq >> 5 & 1) * 2 + (sq >> 2 & 1) for sq in range(64)]
+
+def solveLast1(own, opp, sq):
+    """
+        Returns the exact final disc difference of a position with a single empty square.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param sq: The square index of the empty square.
+        @return: - Type: Integer
+                 - Content: The final number of the player to move's pieces minus the opponent's.
+    """
+    flips = popCount(getFlipsBits(own, opp, sq))
+    if flips:
+        return popCount(own) - popCount(opp) + 2 * flips + 1
+    # Otherwise the opponent may be able to take the last square.
+    flips = popCount(getFlipsBits(opp, own, sq))
+    if flips:
+        return popCount(own) - popCount(opp) - 2 * flips - 1
+    return popCount(own) - popCount(opp)
+
+def solveLast2(own, opp, sq1, sq2, beta, search, passed = False):
+    """
+        Returns the exact final disc difference of a position with 2 empty squares.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param sq1: The square index of the first empty square.
+        @param sq2: The square index of the second empty square.
+        @param beta: The upper bound of the search window.
+        @param search: The search dictionary, with the field "nodes".
+        @param passed: True if the opponent has just passed.
+        @return: - Type: Integer
+                 - Content: The final number of the player to move's pieces minus the opponent's.
+    """
+    search["nodes"] += 1
+    best = -INFINITY
+    for sq, other in ((sq1, sq2), (sq2, sq1)):
+        flips = getFlipsBits(own, opp, sq)
+        if flips:
+            score = -solveLast1(opp ^ flips, own | flips | (1 << sq), other)
+            if score > best:
+                best = score
+                if best >= beta:
+                    return best
+    if best != -INFINITY:
+        return best
+    
+    # No moves, so either the game is over or the player has to pass.
+    if passed:
+        return popCount(own) - popCount(opp)
+    return -solveLast2(opp, own, sq1, sq2, INFINITY, search, True)
+
+def solveLast3(own, opp, squares, alpha, beta, search, passed = False):
+    """
+        Returns the exact final disc difference of a position with 3 empty squares.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param squares: A list of the 3 empty square indexes, in the order to try them.
+        @param alpha: The lower bound of the search window.
+        @param beta: The upper bound of the search window.
+        @param search: The search dictionary, with the field "nodes".
+        @param passed: True if the opponent has just passed.
+        @return: - Type: Integer
+                 - Content: The final number of the player to move's pieces minus the opponent's.
+    """
+    search["nodes"] += 1
+    sq1, sq2, sq3 = squares
+    best = -INFINITY
+    for sq, a, b in ((sq1, sq2, sq3), (sq2, sq1, sq3), (sq3, sq1, sq2)):
+        flips = getFlipsBits(own, opp, sq)
+        if flips:
+            score = -solveLast2(opp ^ flips, own | flips | (1 << sq), a, b, -alpha, search)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        return best
+    if best != -INFINITY:
+        return best
+    
+    # No moves, so either the game is over or the player has to pass.
+    if passed:
+        return popCount(own) - popCount(opp)
+    return -solveLast3(opp, own, squares, -beta, -alpha, search, True)
+
+def parityOrder(squares, empty):
+    """
+        Sorts squares so that those in a quadrant with an odd number of empty squares come first, as the
+        player who moves into an odd region usually gets the last move there.
+        
+        @param squares: A list of square indexes.
+        @param empty: Bitboard of the empty squares.
+        @return: - Type: List of integers
+                 - Content: The sorted square indexes.
+    """
+    odd = [popCount(empty & mask) & 1 for mask in QUADRANT_MASKS]
+    return sorted(squares, key = lambda sq: -odd[SQUARE_QUADRANT[sq]])
+
+def solveBits(own, opp, alpha, beta, search):
+    """
+        Returns the exact final disc difference of a position under perfect play, using alpha-beta
+        with fastest-first and parity move ordering.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param alpha: The lower bound of the search window.
+        @param beta: The upper bound of the search window.
+        @param search: The search dictionary, with fields "deadline" and "nodes".
+        @return: - Type: Integer
+                 - Content: The final number of the player to move's pieces minus the opponent's.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    search["nodes"] += 1
+    if search["nodes"] & 63 == 0 and time.perf_counter() > search["deadline"]:
+        raise SearchTimeout
+    
+    empty = ~(own | opp) & FULL_MASK
+    empties = popCount(empty)
+    
+    # Use the special cased routines for the last few empty squares.
+    if empties <= 3:
+        squares = parityOrder(list(bitsToSquares(empty)), empty)
+        if empties == 3:
+            return solveLast3(own, opp, squares, alpha, beta, search)
+        elif empties == 2:
+            return solveLast2(own, opp, squares[0], squares[1], beta, search)
+        elif empties == 1:
+            return solveLast1(own, opp, squares[0])
+        return popCount(own) - popCount(opp)
+    
+    moves = getMovesBits(own, opp)
+    if moves == 0:
+        # If neither player can move then the game is over.
+        if getMovesBits(opp, own) == 0:
+            return popCount(own) - popCount(opp)
+        return -solveBits(opp, own, -beta, -alpha, search)
+    
+    # Make each move, and sort them so the opponent has as few replies as possible (fastest-first),
+    # with parity breaking ties. Near the end parity alone is cheaper.
+    children = list()
+    for sq in parityOrder(list(bitsToSquares(moves)), empty):
+        flips = getFlipsBits(own, opp, sq)
+        children.append((opp ^ flips, own | flips | (1 << sq)))
+    if empties > FASTEST_FIRST_EMPTIES:
+        children.sort(key = lambda child: popCount(getMovesBits(child[0], child[1])))
+    
+    best = -INFINITY
+    for childOwn, childOpp in children:
+        score = -solveBits(childOwn, childOpp, -beta, -alpha, search)
+        if score > best:
+            best = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best
+
+def solveRoot(own, opp, search):
+    """
+        Solves every move from the root position exactly.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param search: The search dictionary, with fields "deadline" and "nodes".
+        @return: - Type: Tuple
+                 - Content: A tuple (square, score) of the best move, or -1 if the player must pass, and
+                            the final disc difference from the point of view of the player to move.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    moves = getMovesBits(own, opp)
+    if moves == 0:
+        return -1, solveBits(own, opp, -INFINITY, INFINITY, search)
+    
+    alpha = -INFINITY
+    bestSq = -1
+    for sq in orderMoves(moves):
+        flips = getFlipsBits(own, opp, sq)
+        score = -solveBits(opp ^ flips, own | flips | (1 << sq), -INFINITY, -alpha, search)
+        if score > alpha:
+            alpha = score
+            bestSq = sq
+    return bestSq, alpha
+
+def solveSized(own, opp, alpha, beta, search, tables):
+    """
+        The same as "solveBits", on a board of any size, with fastest-first move ordering.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param alpha: The lower bound of the search window.
+        @param beta: The upper bound of the search window.
+        @param search: The search dictionary, with fields "deadline" and "nodes".
+        @param tables: The BoardTables of the board size.
+        @return: - Type: Integer
+                 - Content: The final number of the player to move's pieces minus the opponent's.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    search["nodes"] += 1
+    if search["nodes"] & 63 == 0 and time.perf_counter() > search["deadline"]:
+        raise SearchTimeout
+    
+    getMoves = tables.getMoves
+    moves = getMoves(own, opp)
+    if moves == 0:
+        # If neither player can move then the game is over.
+        if getMoves(opp, own) == 0:
+            return popCount(own) - popCount(opp)
+        return -solveSized(opp, own, -beta, -alpha, search, tables)
+    
+    # Search the moves that leave the opponent the fewest replies first.
+    children = list()
+    for sq in bitsToSquares(moves):
+        flips = tables.getFlips(own, opp, sq)
+        children.append((opp ^ flips, own | flips | (1 << sq)))
+    if moves & (moves - 1):
+        children.sort(key = lambda child: popCount(getMoves(child[0], child[1])))
+    
+    best = -INFINITY
+    for childOwn, childOpp in children:
+        score = -solveSized(childOwn, childOpp, -beta, -alpha, search, tables)
+        if score > best:
+            best = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best
+
+def solveRootSized(own, opp, search, tables):
+    """
+        The same as "solveRoot", on a board of any size.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param search: The search dictionary, with fields "deadline" and "nodes".
+        @param tables: The BoardTables of the board size.
+        @return: - Type: Tuple
+                 - Content: A tuple (square, score) of the best move, or -1 if the player must pass, and
+                            the final disc difference from the point of view of the player to move.
+        @throws: - SearchTimeout: If the search deadline has been passed.
+    """
+    moves = tables.getMoves(own, opp)
+    if moves == 0:
+        return -1, solveSized(own, opp, -INFINITY, INFINITY, search, tables)
+    
+    alpha = -INFINITY
+    bestSq = -1
+    for sq in bitsToSquares(moves):
+        flips = tables.getFlips(own, opp, sq)
+        score = -solveSized(opp ^ flips, own | flips | (1 << sq), -INFINITY, -alpha, search, tables)
+        if score > alpha:
+            alpha = score
+            bestSq = sq
+    return bestSq, alpha
+
+def solveEndgame(board, who, time_ms = None):
+    """
+        Solves the rest of the game exactly, returning the best move and the final score under perfect play.
+        
+        @param board: A list of lists represting the Othello board in (row, column), of any size.
+        @param who: The current players value, i.e 1 or 2.
+        @param time_ms: The time budget in milliseconds, or None for no limit.
+        @return: - Type: Tuple
+                 - Content: A tuple (move, score), where "move" is a (row, column) tuple, or an empty tuple
+                            if "who" has to pass, and "score" is the final "scoreBoard" under perfect play.
+        @throws: - SearchTimeout: If the time budget runs out before the game is solved.
+    """
+    own, opp = splitBits(board, who)
+    deadline = float("inf") if time_ms is None else time.perf_counter() + time_ms / 1000
+    search = {"deadline": deadline, "nodes": 0}
+    size = len(board)
+    if size == 8:
+        sq, score = solveRoot(own, opp, search)
+    else:
+        sq, score = solveRootSized(own, opp, search, boardTables(size))
+    
+    # Convert the score to player 1's point of view, as in "scoreBoard".
+    if who == 2:
+        score = -score
+    return (divmod(sq, size) if sq != -1 else tuple()), score
+
+# ------------------- Parallel search --------------------
+def searchMoveTask(own, opp, sq, depth, alpha, who = 1, weights = None):
+    """
+        Searches a single root move, and is run by the worker processes of "suggestMoveParallel".
+        Each worker process uses its own process wide transposition table, which lasts between tasks.
+        
+        @param own: Bitboard of the player to move at the root.
+        @param opp: Bitboard of the opponent at the root.
+        @param sq: The square index of the root move to search.
+        @param depth: The number of plies to search, including the root move.
+        @param alpha: The best score already found at the root, which the move must beat.
+        @param who: The player to move at the root, i.e 1 or 2, for the pattern evaluation.
+        @param weights: The pattern weight file the caller evaluates with, or None. The worker loads it
+                        first if it has not already, so every move is scored by the same evaluation.
+        @return: - Type: Tuple
+                 - Content: A tuple (square, score, nodes) of the move, its score from the root player's point
+                            of view, and the number of nodes searched.
+    """
+    if weights != _patternWeightsPath:
+        setPatternWeights(weights)
+    search = {"deadline": float("inf"), "nodes": 0, "table": getTransTable()}
+    flips = getFlipsBits(own, opp, sq)
+    childOwn, childOpp = opp ^ flips, own | flips | (1 << sq)
+    score = -negamax(childOwn, childOpp, depth - 1, -INFINITY, -alpha, search,
+                     searchPatterns(childOwn, childOpp, 3 - who))
+    return sq, score, search["nodes"]
+
+def suggestMoveParallel(board, who, depth = 6, workers = None, executor = None):
+    """
+        Returns a tuple of a "ideal" position on the board for "who" to place there piece.
+        The root moves are split across a pool of processes using a young-brothers-wait scheme: the first
+        (most promising) move is searched on its own to get a bound, then the rest are searched in parallel,
+        each one being sent out with the best bound found so far.
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The current players value, i.e 1 or 2.
+        @param depth: The depth in plies to search to.
+        @param workers: The number of worker processes, or None for one per CPU.
+        @param executor: A ProcessPoolExecutor to reuse between moves, or None to start a new one for this move.
+        @return: - Type: Tuple
+                 - Content: A (row, column) tuple position on the "board", or an empty tuple if there
+                            are no valid moves.
+    """
+    own, opp = splitBits(board, who)
+    order = orderMoves(getMovesBits(own, opp))
+    
+    # Check for no valid moves, or only a single one to make.
+    if len(order) == 0:
+        return tuple()
+    if len(order) == 1:
+        return divmod(order[0], 8)
+    
+    # Play the book move if there is one.
+    bookSq = bookMove(own, opp)
+    if bookSq != -1:
+        return divmod(bookSq, 8)
+    
+    # Start a pool for just this move if one was not given.
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if executor is None:
+        with ProcessPoolExecutor(workers) as pool:
+            return suggestMoveParallel(board, who, depth, workers, pool)
+    
+    # Search the eldest brother first to get a bound for the rest.
+    bestSq, alpha, nodes = searchMoveTask(own, opp, order[0], depth, -INFINITY, who, _patternWeightsPath)
+    
+    # Keep at most "workers" moves in flight, so that each new move is sent out with the newest bound.
+    pending = set()
+    waiting = order[1:]
+    while waiting or pending:
+        while waiting and len(pending) < workers:
+            pending.add(executor.submit(searchMoveTask, own, opp, waiting.pop(0), depth, alpha, who,
+                                        _patternWeightsPath))
+        done, pending = wait(pending, return_when = FIRST_COMPLETED)
+        for future in done:
+            sq, score, nodes = future.result()
+            if score > alpha:
+                alpha = score
+                bestSq = sq
+    
+    return divmod(bestSq, 8)
+
+# ------------------- Pondering --------------------
+def ponder(own, opp, who, search):
+    """
+        Searches the AI's reply to every move the opponent could make, deeper and deeper, until stopped.
+        The results are kept in the search's transposition table, so the AI's search after the opponent
+        moves finds most of its work already done. Run by "startPonder" in a background thread.
+        
+        @param own: Bitboard of the opponent, who is to move.
+        @param opp: Bitboard of the AI.
+        @param who: The opponent's player value, i.e 1 or 2.
+        @param search: The search dictionary. Setting its "deadline" to 0 stops the search.
+    """
+    replies = list(bitsToSquares(getMovesBits(own, opp)))
+    try:
+        for d in range(1, 65 - popCount(own | opp)):
+            for sq in replies:
+                flips = getFlipsBits(own, opp, sq)
+                aiOwn, aiOpp = opp ^ flips, own | flips | (1 << sq)
+                if getMovesBits(aiOwn, aiOpp) != 0:
+                    searchRoot(aiOwn, aiOpp, d, search, -1, searchPatterns(aiOwn, aiOpp, 3 - who))
+    except SearchTimeout:
+        pass
+
+def startPonder(board, who, table = None):
+    """
+        Starts pondering in a background thread while player "who" thinks about their move.
+        Nothing else may search with the same transposition table until "stopPonder" has been called.
+        
+        @param board: A list of lists represting the Othello board in (row, column). It must not be
+                      changed until pondering is stopped.
+        @param who: The player who is thinking, i.e the AI's opponent.
+        @param table: The TransTable the AI will search with, or None for the process wide table.
+        @return: - Type: Tuple
+                 - Content: A handle to pass to "stopPonder".
+    """
+    if table is None:
+        table = getTransTable()
+    # Start the generation of the AI's next move now, and the AI's search carries it on.
+    table.newSearch()
+    table.pondered = True
+    own, opp = splitBits(board, who)
+    search = {"deadline": float("inf"), "nodes": 0, "move": -1, "score": -INFINITY, "table": table}
+    thread = threading.Thread(target = ponder, args = (own, opp, who, search), daemon = True)
+    thread.start()
+    return thread, search
+
+def stopPonder(handle):
+    """
+        Stops pondering, and waits for the background thread to finish.
+        
+        @param handle: The handle from "startPonder".
+        @return: - Type: Integer
+                 - Content: The number of nodes searched while pondering.
+    """
+    thread, search = handle
+    search["deadline"] = 0
+    thread.join()
+    return search["nodes"]
+
+# ------------------- Monte Carlo tree search --------------------
+# Exploration constant of the UCT formula.
+UCT_C = 1.4
+# Number of visits at which a RAVE move's all-moves-as-first value and its own value are trusted equally.
+RAVE_EQUIV = 300
+# Square value of a pass, which is a move in the tree but not on the board.
+PASS = -1
+# Untried move bit standing for a forced pass.
+PASS_BIT = 1 << 64
+
+class MCTSNode:
+    """
+        A position in a Monte Carlo search tree, reached by the move "sq" from its parent.
+        Its "wins" are counted for the player who made that move, so a parent picks the child with most wins.
+    """
+    __slots__ = ("own", "opp", "sq", "parent", "children", "untried", "visits", "wins", "amafVisits", "amafWins")
+    
+    def __init__(self, own, opp, sq = PASS, parent = None, rave = False):
+        """
+            @param own: Bitboard of the player to move.
+            @param opp: Bitboard of the opponent.
+            @param sq: The square index of the move which reached this node, or PASS.
+            @param parent: The parent MCTSNode, or None for the root.
+            @param rave: Whether to keep all-moves-as-first statistics of the moves from this node.
+        """
+        self.own = own
+        self.opp = opp
+        self.sq = sq
+        self.parent = parent
+        self.children = list()
+        # Moves still to be added as children.
+        self.untried = getMovesBits(own, opp)
+        if self.untried == 0 and getMovesBits(opp, own) != 0:
+            self.untried = PASS_BIT
+        self.visits = 0
+        self.wins = 0.0
+        self.amafVisits = [0] * 64 if rave else None
+        self.amafWins = [0.0] * 64 if rave else None
+
+def rollout(own, opp, rand):
+    """
+        Plays random moves, picked uniformly from the valid moves, until the game ends. Works only on integers,
+        picking a move by clearing a random number of the lowest move bits, so no lists or objects are made.
+        
+        @param own: Bitboard of the player to move.
+        @param opp: Bitboard of the opponent.
+        @param rand: A function returning a random float in [0, 1), such as "random.random".
+        @return: - Type: Tuple
+                 - Content: A tuple (difference, mine, theirs) of the final piece difference for the player
+                            to move, and bitboards of the squares each side played.
+    """
+    mine = theirs = 0
+    passed = False
+    swapped = False
+    while True:
+        moves = getMovesBits(own, opp)
+        if moves == 0:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            for _ in range(int(rand() * bin(moves).count("1"))):
+                moves &= moves - 1
+            bit = moves & -moves
+            flips = getFlipsBits(own, opp, bit.bit_length() - 1)
+            own, opp = own | flips | bit, opp ^ flips
+            mine |= bit
+        # Swap sides, so that "own" and "mine" always belong to the player to move.
+        own, opp = opp, own
+        mine, theirs = theirs, mine
+        swapped = not swapped
+    if swapped:
+        own, opp = opp, own
+        mine, theirs = theirs, mine
+    return bin(own).count("1") - bin(opp).count("1"), mine, theirs
+
+class MCTSTree:
+    """
+        A Monte Carlo search tree using UCT, with optional RAVE and progressive bias from SQUARE_WEIGHTS.
+        The tree can be kept between moves with "advance", so the playouts under the moves made are reused.
+    """
+    
+    def __init__(self, own, opp, rave = False, bias = 0.0, seed = None):
+        """
+            @param own: Bitboard of the player to move at the root.
+            @param opp: Bitboard of the opponent at the root.
+            @param rave: Whether to blend in all-moves-as-first values when picking moves.
+            @param bias: The weight of the progressive bias, in wins per 100 points of square weight, which
+                         fades as a move is visited. 0 turns it off.
+            @param seed: The seed of the random playouts, or None for a random one.
+        """
+        self.rave = rave
+        self.bias = bias
+        self.random = random.Random(seed).random
+        self.root = MCTSNode(own, opp, rave = rave)
+        self.playouts = 0
+        self.seconds = 0.0
+    
+    def select(self, node):
+        """
+            Returns the child of a fully expanded node with the highest UCT value.
+        """
+        logN = math.log(node.visits)
+        best = None
+        bestValue = -INFINITY
+        for child in node.children:
+            value = child.wins / child.visits
+            # Blend in the all-moves-as-first value, trusting it less as the move itself is visited.
+            if node.amafVisits is not None and child.sq != PASS and node.amafVisits[child.sq] > 0:
+                beta = math.sqrt(RAVE_EQUIV / (3 * child.visits + RAVE_EQUIV))
+                value = (1 - beta) * value + beta * node.amafWins[child.sq] / node.amafVisits[child.sq]
+            value += UCT_C * math.sqrt(logN / child.visits)
+            if self.bias and child.sq != PASS:
+                value += self.bias * SQUARE_WEIGHTS[child.sq] / (100 * (child.visits + 1))
+            if value > bestValue:
+                bestValue = value
+                best = child
+        return best
+    
+    def expand(self, node):
+        """
+            Adds a random untried move of a node as a new child, and returns the child.
+        """
+        moves = node.untried
+        if moves == PASS_BIT:
+            node.untried = 0
+            child = MCTSNode(node.opp, node.own, PASS, node, self.rave)
+        else:
+            for _ in range(int(self.random() * popCount(moves))):
+                moves &= moves - 1
+            bit = moves & -moves
+            node.untried ^= bit
+            sq = bit.bit_length() - 1
+            flips = getFlipsBits(node.own, node.opp, sq)
+            child = MCTSNode(node.opp ^ flips, node.own | flips | bit, sq, node, self.rave)
+        node.children.append(child)
+        return child
+    
+    def playout(self):
+        """
+            Runs one playout: selects down the tree, adds a node, plays randomly to the end, and backs up the result.
+        """
+        # Select a node to add, unless the game has ended.
+        node = self.root
+        while node.untried == 0 and node.children:
+            node = self.select(node)
+        if node.untried != 0:
+            node = self.expand(node)
+        
+        # Play randomly to the end. "result" is for the player to move at "node".
+        diff, mine, theirs = rollout(node.own, node.opp, self.random)
+        result = 1.0 if diff > 0 else 0.0 if diff < 0 else 0.5
+        
+        # Back up to the root, swapping sides each ply.
+        while node is not None:
+            node.visits += 1
+            node.wins += 1.0 - result
+            if node.amafVisits is not None:
+                # Every square played later by the player to move here counts as one of its moves.
+                for sq in bitsToSquares(mine):
+                    node.amafVisits[sq] += 1
+                    node.amafWins[sq] += result
+            if node.sq != PASS:
+                theirs |= 1 << node.sq
+            mine, theirs = theirs, mine
+            result = 1.0 - result
+            node = node.parent
+        self.playouts += 1
+    
+    def run(self, playouts = None, time_ms = None):
+        """
+            Runs playouts until either budget is used up. At least one budget must be given.
+            
+            @param playouts: The number of playouts to run, or None for no limit.
+            @param time_ms: The time budget in milliseconds, or None for no limit.
+            @return: - Type: Integer
+                     - Content: The number of playouts run.
+            @throws: - ValueError: If neither budget is given.
+        """
+        if playouts is None and time_ms is None: raise ValueError((playouts, time_ms))
+        start = time.perf_counter()
+        deadline = start + time_ms / 1000 if time_ms is not None else float("inf")
+        count = 0
+        while playouts is None or count < playouts:
+            self.playout()
+            count += 1
+            # Only check the clock every 16 playouts.
+            if count & 15 == 0 and time.perf_counter() >= deadline:
+                break
+        self.seconds += time.perf_counter() - start
+        return count
+    
+    def rootVisits(self):
+        """
+            Returns the number of visits of each root move, for choosing a move or combining trees.
+            
+            @return: - Type: Dictionary
+                     - Content: The square index (or PASS) of each root move to its visit count.
+        """
+        return {child.sq: child.visits for child in self.root.children}
+    
+    def advance(self, own, opp):
+        """
+            Moves the root to a new position, keeping the subtree under it if it is a child or grandchild of the
+            root (i.e. after one or both players have moved), and otherwise starting a new tree.
+            
+            @param own: Bitboard of the player to move in the new position.
+            @param opp: Bitboard of the opponent.
+            @return: - Type: Boolean
+                     - Content: True if part of the tree was reused.
+        """
+        if (self.root.own, self.root.opp) == (own, opp):
+            return True
+        for child in self.root.children:
+            for node in [child] + child.children:
+                if (node.own, node.opp) == (own, opp):
+                    node.parent = None
+                    self.root = node
+                    return True
+        self.root = MCTSNode(own, opp, rave = self.rave)
+        return False
+
+def mctsTask(own, opp, playouts, time_ms, seed, rave, bias):
+    """
+        Runs a new Monte Carlo search tree, and is run by the worker processes of "suggestMove4".
+        
+        @param own: Bitboard of the player to move at the root.
+        @param opp: Bitboard of the opponent at the root.
+        @param playouts: The number of playouts to run, or None.
+        @param time_ms: The time budget in milliseconds, or None.
+        @param seed: The seed of the random playouts, which should differ between workers.
+        @param rave: Whether to use RAVE.
+        @param bias: The weight of the progressive bias.
+        @return: - Type: Tuple
+                 - Content: A tuple (visits, playouts, seconds) of the root move visit counts, the number of
+                            playouts run and the time taken.
+    """
+    tree = MCTSTree(own, opp, rave, bias, seed)
+    tree.run(playouts, time_ms)
+    return tree.rootVisits(), tree.playouts, tree.seconds
+
+# Process wide tree of "suggestMove4", kept between moves so its playouts can be reused.
+_mctsTree = None
+
+def suggestMove4(board, who, playouts = None, time_ms = 1000, rave = False, bias = 0.0, tree = None, workers = 1,
+                 executor = None, report = None):
+    """
+        Returns a tuple of a "ideal" position on the board for "who" to place there piece.
+        This algorithm plays the book move if there is one, and otherwise uses Monte Carlo tree search, playing
+        the most visited move, or the first ordered move if the budget ran out before any playout. With more
+        than one worker, each worker process grows its own tree and their visits are added up (root parallelism).
+        
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The current players value, i.e 1 or 2.
+        @param playouts: The number of playouts per worker, or None to only use the time budget.
+        @param time_ms: The time budget in milliseconds, or None to only use the playout budget.
+        @param rave: Whether to use RAVE.
+        @param bias: The weight of the progressive bias from SQUARE_WEIGHTS, or 0 for none.
+        @param tree: The MCTSTree to advance and search with, or None for the process wide tree, which is
+                     kept between moves. Not used with more than one worker.
+        @param workers: The number of worker processes, or 1 to search in this process.
+        @param executor: A ProcessPoolExecutor to reuse between moves, or None to start a new one for this move.
+        @param report: A dictionary to fill in with "playouts", "seconds" and "playouts_per_sec", or None.
+        @return: - Type: Tuple
+                 - Content: A (row, column) tuple position on the "board", or an empty tuple if there
+                            are no valid moves.
+        @throws: - ValueError: If neither "playouts" nor "time_ms" is given.
+    """
+    global _mctsTree
+    if playouts is None and time_ms is None: raise ValueError((playouts, time_ms))
+    own, opp = splitBits(board, who)
+    moves = getMovesBits(own, opp)
+    
+    # Check for no valid moves, or only a single one to make.
+    if moves == 0:
+        return tuple()
+    if moves & (moves - 1) == 0:
+        return divmod(moves.bit_length() - 1, 8)
+    
+    # Play the book move if there is one.
+    bookSq = bookMove(own, opp)
+    if bookSq != -1:
+        return divmod(bookSq, 8)
+    
+    if workers > 1:
+        # Start a pool for just this move if one was not given.
+        if executor is None:
+            with ProcessPoolExecutor(workers) as pool:
+                return suggestMove4(board, who, playouts, time_ms, rave, bias, None, workers, pool, report)
+        seed = random.getrandbits(32)
+        futures = [executor.submit(mctsTask, own, opp, playouts, time_ms, seed + i, rave, bias) for i in range(workers)]
+        visits = dict()
+        count = 0
+        seconds = 0.0
+        for future in futures:
+            treeVisits, treePlayouts, treeSeconds = future.result()
+            for sq, v in treeVisits.items():
+                visits[sq] = visits.get(sq, 0) + v
+            count += treePlayouts
+            seconds = max(seconds, treeSeconds)
+    else:
+        # Reuse the process wide tree if it was grown with the same settings.
+        if tree is None:
+            if _mctsTree is None or (_mctsTree.rave, _mctsTree.bias) != (rave, bias):
+                _mctsTree = MCTSTree(own, opp, rave, bias)
+            tree = _mctsTree
+        tree.advance(own, opp)
+        start = time.perf_counter()
+        count = tree.run(playouts, time_ms)
+        seconds = time.perf_counter() - start
+        visits = tree.rootVisits()
+    
+    if report is not None:
+        report["playouts"] = count
+        report["seconds"] = seconds
+        report["playouts_per_sec"] = count / seconds if seconds > 0 else 0.0
+    
+    # Fall back on the first ordered move if the budget ran out before any root move was visited.
+    if not visits or max(visits.values()) == 0:
+        return divmod(orderMoves(moves)[0], 8)
+    return divmod(max(visits, key = visits.get), 8)
+
+# ------------------- Instrumentation --------------------
+# The functions that can be instrumented, and the category each one is counted under.
+INSTRUMENTED = {
+    "getValidMoves": "movegen", "getMovesBits": "movegen",
+    "makeMoveUndo": "apply", "unmakeMove": "apply", "getFlipsBits": "apply", "patternMove": "apply",
+    "evaluateBits": "eval", "evaluatePatterns": "eval",
+    "suggestMove1": "ai", "suggestMove2": "ai", "suggestMove3": "ai", "solveEndgame": "ai",
+    }
+# The recursive search node functions, and the position of their search dictionary argument. Nodes are not
+# counted by calls, but read from the "nodes" field that the search loops keep, which also covers nodes
+# such as those of "solveLast2" and "solveLast3" that are not calls of these functions.
+NODE_FUNCTIONS = {"negamax": 5, "solveBits": 4, "solveSized": 4}
+
+class Stats:
+    """
+        Counters and timings collected while instrumentation is enabled with "enableStats".
+        Read it with "toDict" or "toJson" after a move, and "reset" it before the next one.
+        Only calls made in this process are counted, not those in worker processes. Counters are updated
+        under a lock, so a ponder thread searching at the same time is counted safely, and times are self
+        times, i.e a function's time does not include the instrumented functions it calls.
+    """
+    
+    def __init__(self):
+        self.calls = dict()
+        self.seconds = dict()
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """
+            Sets every counter back to zero.
+        """
+        with self.lock:
+            for name in INSTRUMENTED:
+                self.calls[name] = 0
+                self.seconds[name] = 0.0
+            self.nodes = 0
+            self.ttProbes = 0
+            self.ttHits = 0
+    
+    def toDict(self):
+        """
+            @return: - Type: Dictionary
+                     - Content: The fields "functions" (calls and seconds of each called function),
+                                "categories" (the same summed by category), "nodes" (search nodes visited)
+                                and "tt" (transposition table probes, hits and hit rate).
+        """
+        functions = dict()
+        categories = dict()
+        with self.lock:
+            for name, category in INSTRUMENTED.items():
+                if self.calls[name] == 0:
+                    continue
+                functions[name] = {"category": category, "calls": self.calls[name],
+                                   "seconds": round(self.seconds[name], 6)}
+                total = categories.setdefault(category, {"calls": 0, "seconds": 0})
+                total["calls"] += self.calls[name]
+                total["seconds"] = round(total["seconds"] + self.seconds[name], 6)
+            return {"functions": functions,
+                    "categories": categories,
+                    "nodes": self.nodes,
+                    "tt": {"probes": self.ttProbes, "hits": self.ttHits,
+                           "hit_rate": round(self.ttHits / self.ttProbes, 4) if self.ttProbes else None}}
+    
+    def toJson(self):
+        """
+            @return: - Type: String
+                     - Content: "toDict" as JSON.
+        """
+        return json.dumps(self.toDict())
+
+# The stats being collected, and the original functions that have been replaced, while enabled.
+_stats = None
+_originals = dict()
+
+def _instrument(name, fn, stats, timed, local):
+    """
+        Returns a wrapper of "fn" which counts, and optionally times, its calls into "stats".
+        "local" is a thread local object, whose "inner" field holds the time spent in instrumented calls
+        made by the current call, so that it can be taken off to leave the self time.
+    """
+    calls = stats.calls
+    seconds = stats.seconds
+    lock = stats.lock
+    if not timed:
+        def counted(*args, **kwargs):
+            with lock:
+                calls[name] += 1
+            return fn(*args, **kwargs)
+        return counted
+    
+    clock = time.perf_counter
+    def timedCall(*args, **kwargs):
+        outer = getattr(local, "inner", 0.0)
+        local.inner = 0.0
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            with lock:
+                seconds[name] += elapsed - local.inner
+                calls[name] += 1
+            local.inner = outer + elapsed
+    return timedCall
+
+def _instrumentNodes(fn, stats, arg, local):
+    """
+        Returns a wrapper of the search node function "fn", which adds the nodes searched below its
+        outermost call to "stats", from the search dictionary at position "arg" of its arguments.
+    """
+    lock = stats.lock
+    def countedNodes(*args):
+        # Recursive calls are counted by the outermost call of this thread.
+        if getattr(local, "searching", False):
+            return fn(*args)
+        search = args[arg]
+        before = search["nodes"]
+        local.searching = True
+        try:
+            return fn(*args)
+        finally:
+            local.searching = False
+            with lock:
+                stats.nodes += search["nodes"] - before
+    return countedNodes
+
+def _setSizeTables(module):
+    """
+        Points the cached 8x8 BoardTables at the module's current move functions, as it holds its own
+        references to them.
+    """
+    tables = _boardTables.get(8)
+    if tables is not None:
+        tables.getMoves, tables.getFlips = module["getMovesBits"], module["getFlipsBits"]
+
+def enableStats(timed = True):
+    """
+        Turns instrumentation on, by swapping the module's functions for counting wrappers. While it is off
+        the original functions are used, so there is no cost at all.
+        Only calls made through the module's names are seen, and the 8x8 BoardTables, but not references
+        taken before it was enabled, nor the numpy functions of "batch" and "scheduler", which are separate.
+        
+        @param timed: If True, time each call as well as counting it.
+        @return: - Type: Stats
+                 - Content: The stats object that calls are counted into.
+    """
+    global _stats
+    disableStats()
+    _stats = Stats()
+    local = threading.local()
+    module = globals()
+    for name in INSTRUMENTED:
+        _originals[name] = module[name]
+        module[name] = _instrument(name, module[name], _stats, timed, local)
+    for name, arg in NODE_FUNCTIONS.items():
+        _originals[name] = module[name]
+        module[name] = _instrumentNodes(module[name], _stats, arg, local)
+    _setSizeTables(module)
+    
+    stats = _stats
+    probe = TransTable.probe
+    _originals["TransTable.probe"] = probe
+    def countedProbe(self, key):
+        entry = probe(self, key)
+        with stats.lock:
+            stats.ttProbes += 1
+            if entry is not None:
+                stats.ttHits += 1
+        return entry
+    TransTable.probe = countedProbe
+    return _stats
+
+def disableStats():
+    """
+        Turns instrumentation off, putting the original functions back.
+        
+        @return: - Type: Stats
+                 - Content: The stats that were collected, or None if instrumentation was not on.
+    """
+    global _stats
+    module = globals()
+    for name, fn in _originals.items():
+        if name == "TransTable.probe":
+            TransTable.probe = fn
+        else:
+            module[name] = fn
+    _originals.clear()
+    _setSizeTables(module)
+    stats = _stats
+    _stats = None
+    return stats
+
+def getStats():
+    """
+        @return: - Type: Stats
+                 - Content: The stats being collected, or None if instrumentation is off.
+    """
+    return _stats
+
+# ------------------- Main function --------------------
+def play(quiet = False, log = None):
+    """
+        Plays the game Orthello in the command console.
+        
+        @param quiet: If True, the computer players' turns are not printed, only the human players' turns and
+                      the end result, so that games between computers do no output until they end.
+        @param log: The path of a file to write each move to, one per line, e.g "d3" or "pass", and then the
+                    end score, or None for no log.
+        @return: - Type: void
+                 - Content: N/A
+    """
+    # Print welcoming messages.
+    print("*"*55)
+    print("***"+" "*8+"WELCOME TO JOSH'S OTHELLO GAME!"+" "*8+"***")
+    print("*"*55,"\n")
+    print("Enter the players' names, or type 'C' or 'A' or 'S' or 'M' or 'L'.\n")
+
+    # Initilise player 1's name.
+    player1Name = ""
+    # Keep looping until a non-empty string is given as a name for player 1.
+    while player1Name == "":
+        player1Name = input("Please input Player 1's name: ")
+    # Capitilise the first letter of player 1's name.
+    player1Name = player1Name[0].upper() + player1Name[1:]  
+    
+    # Check if player 1 name is L, if so load the game.txt file.
+    if player1Name == "L":
+        # Load function.
+        game = loadGame()
+        # Stop if it could not be loaded, as "loadGame" has printed why.
+        if game is None:
+            return
+        # The console game and its computer players only play on 8x8 boards.
+        size = len(game["board"])
+        if size != 8:
+            print("Error: Only 8x8 games can be played here, not " + str(size) + "x" + str(size) + ".")
+            return
+    # Otherwise continue on for a new game.
+    else:
+        # Initilise player 2's name.
+        player2Name = ""
+        # Keep looping until a non-empty string is given as a name for player 2.
+        while player2Name == "":
+            player2Name = input("Please input Player 2's name: ")
+        # Capitilise the first letter of player 2's name.
+        player2Name = player2Name[0].upper() + player2Name[1:]  
+        
+        # Create a new game.
+        game = newGame(player1Name, player2Name)
+    
+    # Initlise some variables.
+    player1Comp = bool(False)
+    player2Comp = bool(False)
+    
+    # Check if either playre is a computer.
+    if game["player1"] in ["C", "A", "S", "M"]:
+        player1Comp = True
+    if game["player2"] in ["C", "A", "S", "M"]:
+        player2Comp = True
+    
+    # Keep the moves, counts and hash of the board up to date as the game goes on.
+    position = Position(game["board"], game["who"])
+    
+    # Open the log of the moves, which is buffered so that it is written in large blocks.
+    logFile = open(log, mode = "wt", encoding = "utf8") if log is not None else None
+        
+    try:
+        while True:
+            # Print to console current board, unless it is a computer's turn in quiet mode.
+            if not quiet or not (player1Comp if game["who"] == 1 else player2Comp):
+                printBoard(game["board"])
+            #Check which persons turn it is.
+            if game["who"] == 1:
+                # Check if player is a computer or human.
+                if player1Comp:
+                    if not quiet:
+                        print("Comp 1 is thinking...")
+                    # Get valid moves with current board.
+                    validMoves = position.validMoves()
+                    # Check which computer algorithm to use to determine move.
+                    if game["player1"] == "C":
+                        bestMove = suggestMove1(game["board"], game["who"], position)
+                    elif game["player1"] == "A":
+                        bestMove = suggestMove2(game["board"], game["who"], position)
+                    elif game["player1"] == "S":
+                        bestMove = suggestMove3(game["board"], game["who"], position = position)
+                    elif game["player1"] == "M":
+                        bestMove = suggestMove4(game["board"], game["who"])
+                    # Check for an empty tuple move bestMove, as player may not have any valid moves.
+                    if bestMove != tuple():
+                        # Make the suggested move on the current board.
+                        position.makeMove(bestMove)
+                        if not quiet:
+                            print("Comp 1 chose to go", indexToStr(bestMove))
+                    else:
+                        if not quiet:
+                            print("Comp 1 skipping go, no valid moves.")
+                        position.passMove()
+                    played = bestMove
+                else:
+                    # Get valid moves with current board.
+                    validMoves = position.validMoves()
+                    # Convert valid moves into a string for outputting to player.
+                    strValidMoves = [indexToStr(x) for x in validMoves]
+                    # Let the search AI think about its reply while the player decides.
+                    ponderHandle = startPonder(game["board"], game["who"]) if game["player2"] == "S" else None
+                    # Loop until a valid move is given.
+                    while validMoves != []:   
+                        print("Valid moves are: ", strValidMoves)
+                        # Get a input from player.
+                        move = input("Please enter a valid move: ")
+                        # Check for validity of move.
+                        if move != "" and ((move in strValidMoves) or (move in [x[::-1] for x in strValidMoves])):
+                            # Convert string to a tuple move.
+                            move = strToIndex(move)
+                            break
+                        else:
+                            print("You inputted: ", move)
+                            print("Not valid move, try again.")
+                    # Stop pondering before the board changes.
+                    if ponderHandle is not None:
+                        stopPonder(ponderHandle)
+                    # Make the move, or skip if the player has no valid moves.
+                    if validMoves != []:
+                        position.makeMove(move)
+                        played = move
+                    else:
+                        print("Player 1 skipping go, no valid moves.")
+                        position.passMove()
+                        played = tuple()
+            elif game["who"] == 2:
+                if player2Comp:
+                    if not quiet:
+                        print("Comp 2 is thinking...")
+                    # Get valid moves with current board.
+                    validMoves = position.validMoves()
+                    # Check which computer algorithm to use to determine move.
+                    if game["player2"] == "C":
+                        bestMove = suggestMove1(game["board"], game["who"], position)
+                    elif game["player2"] == "A":
+                        bestMove = suggestMove2(game["board"], game["who"], position)
+                    elif game["player2"] == "S":
+                        bestMove = suggestMove3(game["board"], game["who"], position = position)
+                    elif game["player2"] == "M":
+                        bestMove = suggestMove4(game["board"], game["who"])
+                    # Check for an empty tuple move bestMove, as player may not have any valid moves.
+                    if bestMove != tuple():
+                        # Make the suggested move on the current board.
+                        position.makeMove(bestMove)
+                        if not quiet:
+                            print("Comp 2 chose to go", indexToStr(bestMove))
+                    else:
+                        if not quiet:
+                            print("Comp 2 skipping go, no valid moves.")
+                        position.passMove()
+                    played = bestMove
+                else:
+                    # Get valid moves with current board.
+                    validMoves = position.validMoves()
+                    # Convert valid moves into a string for outputting to player.
+                    strValidMoves = [indexToStr(x) for x in validMoves]
+                    # Let the search AI think about its reply while the player decides.
+                    ponderHandle = startPonder(game["board"], game["who"]) if game["player1"] == "S" else None
+                    # Loop until a valid move is given.
+                    while validMoves != []:   
+                        print("Valid moves are: ", strValidMoves)
+                        # Get a input from player.
+                        move = input("Please enter a valid move: ")
+                        # Check for validity of move.
+                        if move != "" and ((move in strValidMoves) or (move in [x[::-1] for x in strValidMoves])):
+                            # Convert string to a tuple move.
+                            move = strToIndex(move)
+                            break
+                        else:
+                            print("You inputted: ", move)
+                            print("Not valid move, try again.")
+                    # Stop pondering before the board changes.
+                    if ponderHandle is not None:
+                        stopPonder(ponderHandle)
+                    # Make the move, or skip if the player has no valid moves.
+                    if validMoves != []:
+                        position.makeMove(move)
+                        played = move
+                    else:
+                        print("Player 2 skipping go, no valid moves.")
+                        position.passMove()
+                        played = tuple()
+            
+            # Altenate between the current player who variable, which making the move (or skipping) has done.
+            game["who"] = position.who
+            
+            # Log the move, using the precomputed square names.
+            if logFile is not None:
+                logFile.write((SQUARE_NAMES[played[0]*8 + played[1]] if played != tuple() else "pass") + "\n")
+            
+            # Check if both players have no valid moves, if so then game has ended.
+            if position.isOver():
+                # Print final board.
+                if not quiet:
+                    printBoard(game["board"])
+                score = position.score()
+                if logFile is not None:
+                    logFile.write("score " + str(score) + "\n")
+                print("The end score is:", score)
+                if score > 0:
+                    print("Player 1 has won.")
+                elif score < 0:
+                    print("Player 2 has won.")
+                elif score == 0:
+                    print("Draw")
+                return
+    finally:
+        # Close the log however the game ends, so no buffered moves are lost.
+        if logFile is not None:
+            logFile.close()
     
 # the following allows your module to be run as a program
 if __name__ == '__main__' or __name__ == 'builtins':
-    play()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = "Play Othello in the console.")
+    parser.add_argument("-q", "--quiet", action = "store_true", help = "Do not print the computer players' turns.")
+    parser.add_argument("--log", help = "File to write every move to.")
+    args = parser.parse_known_args()[0]
+    play(args.quiet, args.log)
\ No newline at end of file
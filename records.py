@@ -0,0 +1,163 @@
+"""
+A compact binary format for Othello game records, with a streaming writer and reader.
+
+A file is RECORD_MAGIC followed by any number of records, each of which is:
+    - 1 byte of flags, where bit 0 is set if the game starts from its own position.
+    - 1 byte name length and the UTF-8 name of player 1, then the same for player 2.
+    - If bit 0 of the flags is set: player 1's and player 2's bitboards as little-endian uint64s,
+      then 1 byte for the player to move.
+    - The number of moves as a little-endian uint16, then 1 byte per move: the square index
+      (row*8 + col), or PASS for a pass.
+
+Run as a program to convert text games, as read by "othello.loadGame", e.g: "python records.py out.bin game*.txt".
+"""
+
+import struct
+import sys
+
+import othello
+
+RECORD_MAGIC = b"OTHREC01"
+# The move byte used for a pass.
+PASS = 64
+# Flag set when a record starts from its own position instead of the new game position.
+FLAG_POSITION = 1
+# Player 1's and player 2's bitboards of the new game position, for records without their own position.
+START_BITS = othello.boardToBits(othello.newGame("C", "C")["board"])
+
+_POSITION = struct.Struct("<QQB")
+_COUNT = struct.Struct("<H")
+
+class GameWriter:
+    """
+        Writes game records one at a time to a file, so any number of games can be written without
+        holding them in memory. Use it as a context manager, or call "close" when done.
+    """
+    
+    def __init__(self, path):
+        """
+            @param path: The path of the file to write.
+        """
+        self.file = open(path, "wb")
+        self.file.write(RECORD_MAGIC)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """
+            Closes the file.
+        """
+        self.file.close()
+    
+    def write(self, player1, player2, moves, board = None, who = 1):
+        """
+            Writes a single game.
+            
+            @param player1: Player 1's name.
+            @param player2: Player 2's name.
+            @param moves: A list of (row, column) tuples, with an empty tuple for a pass.
+            @param board: The board the game starts from, or None for the new game position.
+            @param who: The player to move first on "board", i.e 1 or 2.
+            @throws: - ValueError: If a name is empty or longer than 255 bytes.
+        """
+        name1 = str(player1).encode("utf8")
+        name2 = str(player2).encode("utf8")
+        if not 0 < len(name1) <= 255 or not 0 < len(name2) <= 255: raise ValueError((player1, player2))
+        
+        parts = [bytes([FLAG_POSITION if board is not None else 0, len(name1)]), name1, bytes([len(name2)]), name2]
+        if board is not None:
+            parts.append(_POSITION.pack(*othello.boardToBits(board), who))
+        parts.append(_COUNT.pack(len(moves)))
+        parts.append(bytes(move[0]*8 + move[1] if move != tuple() else PASS for move in moves))
+        self.file.write(b"".join(parts))
+
+def readGames(path):
+    """
+        Generator which reads the games of a record file one at a time.
+        
+        @param path: The path of the record file.
+        @yield: - Type: Dictionary
+                - Content: A game dictionary, as from "othello.newGame", of the starting position, with an
+                           added field "moves" of (row, column) tuples, with an empty tuple for a pass.
+        @throws: - ValueError: If the file is not a record file, or ends part way through a record.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(RECORD_MAGIC)) != RECORD_MAGIC: raise ValueError(path)
+        
+        def readExactly(n):
+            data = f.read(n)
+            if len(data) != n: raise ValueError(path)
+            return data
+        
+        while True:
+            flags = f.read(1)
+            # A clean end of file is only allowed between records.
+            if flags == b"":
+                return
+            name1 = readExactly(readExactly(1)[0]).decode("utf8")
+            name2 = readExactly(readExactly(1)[0]).decode("utf8")
+            # The game is built here rather than by "othello.newGame", which refuses the empty names that
+            # older files may hold.
+            if flags[0] & FLAG_POSITION:
+                p1Bits, p2Bits, who = _POSITION.unpack(readExactly(_POSITION.size))
+            else:
+                (p1Bits, p2Bits), who = START_BITS, 1
+            game = {"player1": name1, "player2": name2, "who": who, "board": othello.bitsToBoard(p1Bits, p2Bits)}
+            count = _COUNT.unpack(readExactly(_COUNT.size))[0]
+            game["moves"] = [divmod(sq, 8) if sq != PASS else tuple() for sq in readExactly(count)]
+            yield game
+
+def replayGame(game):
+    """
+        Generator which replays a game record through "othello.makeMove", position by position.
+        
+        @param game: A game dictionary from "readGames".
+        @yield: - Type: Tuple
+                - Content: A tuple (board, who, move) for each move, where "board" is the position before "move"
+                           is made by "who". The same board list is updated in place between yields.
+        @return: - Type: List of Lists
+                 - Content: The final board, as the generator's return value.
+    """
+    board = [line[:] for line in game["board"]]
+    who = game["who"]
+    for move in game["moves"]:
+        yield board, who, move
+        if move != tuple():
+            othello.makeMove(board, move, who)
+        who = 3 - who
+    return board
+
+def convertText(paths, outPath):
+    """
+        Converts text games, as read by "othello.loadGame", into a record file. Files that cannot be
+        loaded, or whose board is not 8x8, are skipped.
+        
+        @param paths: A list of the paths of the text games.
+        @param outPath: The path of the record file to write.
+        @return: - Type: Integer
+                 - Content: The number of games converted.
+    """
+    converted = 0
+    with GameWriter(outPath) as writer:
+        for path in paths:
+            game = othello.loadGame(path)
+            if game is None:
+                print("Skipping", path)
+                continue
+            # Records only hold 8x8 boards.
+            if len(game["board"]) != 8:
+                print("Skipping", path + ", as its board is not 8x8.", file = sys.stderr)
+                continue
+            writer.write(game["player1"], game["player2"], [], game["board"], game["who"])
+            converted += 1
+    return converted
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python records.py out.bin game.txt [game2.txt ...]")
+    else:
+        print("Converted", convertText(sys.argv[2:], sys.argv[1]), "games.")
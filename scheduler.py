@@ -0,0 +1,149 @@
+"""
+Batched AI moves for many games at once. Move requests from every game are collected, identical positions
+are merged, and the 2 ply search of all of them is evaluated in a single vectorised NumPy batch.
+"""
+
+import asyncio
+
+import numpy as np
+
+import batch
+import othello
+
+def suggestBatch(positions):
+    """
+        Returns a move for each of many positions, searching 2 plies (each move and the opponent's best reply)
+        with every leaf of every position evaluated together. Identical positions, including symmetric copies
+        of each other, and identical leaves are only evaluated once.
+        
+        @param positions: A list of (board, who) tuples.
+        @return: - Type: List of tuples
+                 - Content: The (row, column) move for each position, or an empty tuple if it has no valid moves.
+    """
+    # Merge identical positions, searching the canonical copy of each one.
+    canonical = [othello.canonicalBits(*othello.splitBits(board, who)) for board, who in positions]
+    keys = [c[:2] for c in canonical]
+    unique = list(dict.fromkeys(keys))
+    own = np.array([k[0] for k in unique], dtype = np.uint64)
+    opp = np.array([k[1] for k in unique], dtype = np.uint64)
+    
+    # First ply: every move of every position.
+    roots, squares, ownAfter, oppAfter = batch.expandBatch(own, opp)
+    # Second ply: every reply to every move, leaving the original player to move.
+    replies, _, leafOwn, leafOpp = batch.expandBatch(ownAfter, oppAfter)
+    
+    # Evaluate each distinct leaf once, from the original player's point of view.
+    pairs, inverse = np.unique(np.stack([leafOwn, leafOpp], axis = 1), axis = 0, return_inverse = True)
+    leafScores = batch.evaluateBatch(pairs[:, 0], pairs[:, 1])[inverse.reshape(-1)]
+    
+    # A move is worth the opponent's best reply, or its own score if the opponent has to pass.
+    values = -batch.evaluateBatch(ownAfter, oppAfter)
+    hasReply = np.zeros(len(values), dtype = bool)
+    hasReply[replies] = True
+    replyValues = np.full(len(values), np.iinfo(np.int64).max)
+    np.minimum.at(replyValues, replies, leafScores)
+    values = np.where(hasReply, replyValues, values)
+    
+    # Keep every move of each position that ties for the best value.
+    bestValues = np.full(len(unique), np.iinfo(np.int64).min)
+    np.maximum.at(bestValues, roots, values)
+    tied = values == bestValues[roots]
+    best = dict()
+    for root, sq in zip(roots[tied].tolist(), squares[tied].tolist()):
+        best.setdefault(root, list()).append(sq)
+    
+    # Map the tied moves back from the canonical copy to the position's own board, and take the lowest square
+    # there as "getValidMoves" order would, so every symmetric copy of a position gets the same move.
+    index = {key: i for i, key in enumerate(unique)}
+    moves = list()
+    for own, opp, sym in canonical:
+        tiedSquares = best.get(index[(own, opp)])
+        if tiedSquares is None:
+            moves.append(tuple())
+            continue
+        inverse = othello.SYMMETRY_SQUARES[othello.SYMMETRY_INVERSE[sym]]
+        moves.append(divmod(min(inverse[sq] for sq in tiedSquares), 8))
+    return moves
+
+class BatchScheduler:
+    """
+        Collects AI move requests from many games running on one event loop, and answers them together
+        with "suggestBatch" once "maxBatch" requests are waiting or the oldest has waited "maxWaitMs".
+    """
+    
+    def __init__(self, maxBatch = 256, maxWaitMs = 5, executor = None):
+        """
+            @param maxBatch: The most requests to answer in one batch.
+            @param maxWaitMs: The longest a request waits for others to join its batch, in milliseconds.
+            @param executor: The executor to run batches in, or None for the event loop's default.
+        """
+        self.maxBatch = maxBatch
+        self.maxWaitMs = maxWaitMs
+        self.executor = executor
+        self.pending = list()
+        self.timer = None
+        # The batches being answered, kept so they are not garbage collected while running.
+        self.tasks = set()
+        self.positions = 0
+        self.batches = 0
+    
+    async def suggest(self, board, who):
+        """
+            Asks for a move, waiting until the batch it joins has been answered.
+            
+            @param board: A list of lists represting the Othello board in (row, column). It is copied.
+            @param who: The player to move, i.e 1 or 2.
+            @return: - Type: Tuple
+                     - Content: The (row, column) move, or an empty tuple if there are no valid moves.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append(([line[:] for line in board], who, future))
+        if len(self.pending) >= self.maxBatch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.maxWaitMs / 1000, self.flush)
+        return await future
+    
+    def flush(self):
+        """
+            Sends every waiting request off as one batch.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        requests = self.pending
+        self.pending = list()
+        self.positions += len(requests)
+        self.batches += 1
+        task = asyncio.ensure_future(self.answer(requests))
+        self.tasks.add(task)
+        task.add_done_callback(self.finished)
+    
+    def finished(self, task):
+        """
+            Forgets a batch once it has been answered, and reports it if it failed.
+        """
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            task.get_loop().call_exception_handler({"message": "Batch failed", "exception": task.exception(),
+                                                    "task": task})
+    
+    async def answer(self, requests):
+        """
+            Runs a batch in the executor and answers each of its requests.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            moves = await loop.run_in_executor(self.executor, suggestBatch, [(b, w) for b, w, f in requests])
+        except Exception as e:
+            for board, who, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # A request's future is cancelled if its game went away while waiting.
+        for (board, who, future), move in zip(requests, moves):
+            if not future.done():
+                future.set_result(move)
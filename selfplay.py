@@ -0,0 +1,133 @@
+"""
+Headless self-play for the Othello module, for playing many AI against AI games without any console I/O.
+Run as a program, e.g: "python selfplay.py C A -n 1000 --workers 8 > games.jsonl".
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import othello
+
+def playerFunction(letter, time_ms = 100):
+    """
+        Returns the AI function for a computer player letter, as used by "play".
+        
+        @param letter: "C", "A", "S" or "M".
+        @param time_ms: The time budget per move in milliseconds for the "S" and "M" players.
+        @return: - Type: Function
+                 - Content: A function f(board, who) which returns a (row, column) move.
+        @throws: - ValueError: If the letter is not a computer player.
+    """
+    if letter == "C":
+        return othello.suggestMove1
+    elif letter == "A":
+        return othello.suggestMove2
+    elif letter == "S":
+        return functools.partial(othello.suggestMove3, time_ms = time_ms)
+    elif letter == "M":
+        return functools.partial(othello.suggestMove4, time_ms = time_ms)
+    raise ValueError(letter)
+
+def playGame(player1_fn, player2_fn, seed, openingMoves = 4):
+    """
+        Plays a single game between 2 AI functions, starting with a few random moves so that games differ.
+        
+        @param player1_fn: A function f(board, who) which returns player 1's move.
+        @param player2_fn: A function f(board, who) which returns player 2's move.
+        @param seed: The seed for the random opening moves.
+        @param openingMoves: The number of random moves to play before the AIs take over.
+        @return: - Type: Dictionary
+                 - Content: A dictionary with fields "seed", "moves" (coordinate strings, or None for a pass),
+                            "score" (the final "scoreBoard") and "think_ms" (time taken for each move).
+    """
+    rand = random.Random(seed)
+    board = othello.newGame("C", "C")["board"]
+    players = {1: player1_fn, 2: player2_fn}
+    who = 1
+    moves = list()
+    thinkTimes = list()
+    
+    # Throw away anything the AIs print.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while True:
+            validMoves = othello.getValidMoves(board, who)
+            if validMoves == []:
+                # The game is over when neither player can move, otherwise pass.
+                if othello.getValidMoves(board, 3 - who) == []:
+                    break
+                moves.append(None)
+                thinkTimes.append(0.0)
+            else:
+                start = time.perf_counter()
+                if len(moves) < openingMoves:
+                    move = rand.choice(validMoves)
+                else:
+                    move = players[who](board, who)
+                thinkTimes.append(round((time.perf_counter() - start) * 1000, 3))
+                othello.makeMove(board, move, who)
+                moves.append(othello.indexToStr(move))
+            who = 3 - who
+    
+    return {"seed": seed, "moves": moves, "score": othello.scoreBoard(board), "think_ms": thinkTimes}
+
+def simulate(player1_fn, player2_fn, n_games, seed = 0, workers = 1, openingMoves = 4):
+    """
+        Plays many games between 2 AI functions, yielding each game's result as soon as it is ready.
+        Game "i" uses the seed "seed + i", so a run can be repeated exactly.
+        
+        @param player1_fn: A function f(board, who) which returns player 1's move. Must be a module
+                           level function (or a functools.partial of one) when "workers" > 1.
+        @param player2_fn: A function f(board, who) which returns player 2's move.
+        @param n_games: The number of games to play.
+        @param seed: The seed of the first game.
+        @param workers: The number of worker processes to play games in.
+        @param openingMoves: The number of random moves to play at the start of each game.
+        @yield: - Type: Dictionary
+                - Content: The result of "playGame" with an added "game" field, in game order.
+    """
+    seeds = range(seed, seed + n_games)
+    if workers <= 1:
+        results = (playGame(player1_fn, player2_fn, s, openingMoves) for s in seeds)
+        for game, result in enumerate(results):
+            result["game"] = game
+            yield result
+        return
+    
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(playGame, *zip(*[(player1_fn, player2_fn, s, openingMoves) for s in seeds]),
+                           chunksize = max(1, n_games // (workers * 8)))
+        for game, result in enumerate(results):
+            result["game"] = game
+            yield result
+
+def main():
+    parser = argparse.ArgumentParser(description = "Play AI against AI Othello games, writing one JSON line per game.")
+    parser.add_argument("player1", choices = ["C", "A", "S", "M"])
+    parser.add_argument("player2", choices = ["C", "A", "S", "M"])
+    parser.add_argument("-n", "--games", type = int, default = 100)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--workers", type = int, default = 1)
+    parser.add_argument("--opening", type = int, default = 4, help = "Random moves played at the start of each game.")
+    parser.add_argument("--time-ms", type = int, default = 100, help = "Time budget per move for the 'S' and 'M' players.")
+    parser.add_argument("-o", "--output", help = "File to write to, instead of standard output.")
+    args = parser.parse_args()
+    
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for result in simulate(playerFunction(args.player1, args.time_ms), playerFunction(args.player2, args.time_ms),
+                               args.games, args.seed, args.workers, args.opening):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+An asyncio server for playing many human against AI Othello games at once, over plain TCP with a line protocol,
+and a load-test client for it.
+Run as a program, e.g: "python server.py serve --port 7777" and "python server.py loadtest --clients 200".
+
+Every message is a single line of space separated words. Client to server:
+    NEW <ai>            Start a game against the AI "C", "A", "S" or "B", with the client as player 1. The "B"
+                        AI's moves are batched with those of every other "B" game waiting at the same time.
+    MOVE <id> <coord>   Make a move, e.g: "MOVE 3 d3". The AI replies before the new state is sent.
+    BOARD <id>          Ask for the state of a game.
+    QUIT                Close the connection.
+A game can only be seen or played by the connection that started it, and is freed when that connection closes.
+Server to client:
+    STATE <id> <who> <board> <moves>   "board" is 64 digits in (row, column) order, and "moves" the
+                                       comma separated valid moves of player 1, or "-" if it is not their go.
+    END <id> <score>                   The game is over, with the final "scoreBoard".
+    ERR <message>
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import othello
+import scheduler
+import selfplay
+
+def aiMove(letter, board, who, time_ms):
+    """
+        Returns the move of an AI player, throwing away anything it prints. Run in the executor.
+        
+        @param letter: The AI letter, "C", "A" or "S".
+        @param board: A list of lists represting the Othello board in (row, column).
+        @param who: The AI's player value, i.e 1 or 2.
+        @param time_ms: The time budget of the "S" player in milliseconds.
+        @return: - Type: Tuple
+                 - Content: The (row, column) move, or an empty tuple if there are no valid moves.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return selfplay.playerFunction(letter, time_ms)(board, who)
+
+class GameServer:
+    """
+        Holds every game in memory as a game dictionary from "othello.newGame", and serves them to clients.
+        AI moves are run in an executor so that searches never block the event loop, and the "B" AI's moves
+        are collected by a "scheduler.BatchScheduler" so that concurrent games share a batch.
+    """
+    
+    def __init__(self, executor, time_ms = 100):
+        """
+            @param executor: The executor to run AI moves and batches in.
+            @param time_ms: The time budget of the "S" player in milliseconds.
+        """
+        self.executor = executor
+        self.time_ms = time_ms
+        self.scheduler = scheduler.BatchScheduler(executor = executor)
+        self.games = dict()
+        self.locks = dict()
+        self.nextId = 1
+    
+    def state(self, gameId):
+        """
+            @return: - Type: String
+                     - Content: The STATE or END line of a game.
+        """
+        game = self.games[gameId]
+        board = game["board"]
+        if othello.getValidMoves(board, 1) == [] and othello.getValidMoves(board, 2) == []:
+            return "END %d %d" % (gameId, othello.scoreBoard(board))
+        moves = ",".join(othello.indexToStr(m) for m in othello.getValidMoves(board, 1)) if game["who"] == 1 else "-"
+        return "STATE %d %d %s %s" % (gameId, game["who"], "".join(str(n) for line in board for n in line), moves)
+    
+    async def playAI(self, gameId):
+        """
+            Plays the AI's moves until it is the human's go or the game is over. The human passes
+            automatically if they have no valid moves.
+        """
+        game = self.games[gameId]
+        loop = asyncio.get_running_loop()
+        while True:
+            board = game["board"]
+            if othello.getValidMoves(board, 1) == [] and othello.getValidMoves(board, 2) == []:
+                return
+            if game["who"] == 1:
+                if othello.getValidMoves(board, 1) != []:
+                    return
+                game["who"] = 2
+                continue
+            if game["player2"] == "B":
+                move = await self.scheduler.suggest(board, 2)
+            else:
+                move = await loop.run_in_executor(self.executor, aiMove, game["player2"],
+                                                  [line[:] for line in board], 2, self.time_ms)
+            if move != tuple():
+                othello.makeMove(board, move, 2)
+            game["who"] = 1
+    
+    def forget(self, gameId):
+        """
+            Frees a game, if it is still held.
+        """
+        self.games.pop(gameId, None)
+        self.locks.pop(gameId, None)
+    
+    async def handle(self, words, owned):
+        """
+            Handles a single request.
+            
+            @param words: The words of the request line.
+            @param owned: The set of game ids created by the client's connection, which is the only one
+                          allowed to play or see them.
+            @return: - Type: String
+                     - Content: The reply line, or None to close the connection.
+        """
+        if words == [] or words[0] == "QUIT":
+            return None
+        command = words[0]
+        
+        if command == "NEW" and len(words) == 2 and words[1] in ["C", "A", "S", "B"]:
+            gameId = self.nextId
+            self.nextId += 1
+            self.games[gameId] = othello.newGame("Client", words[1])
+            self.locks[gameId] = asyncio.Lock()
+            owned.add(gameId)
+            return self.state(gameId)
+        
+        if command in ["MOVE", "BOARD"] and len(words) >= 2 and othello.isInt(words[1]):
+            gameId = int(words[1])
+            if gameId not in owned or gameId not in self.locks:
+                return "ERR unknown game"
+            async with self.locks[gameId]:
+                # The game may have ended while waiting for the lock.
+                if gameId not in self.games:
+                    return "ERR unknown game"
+                if command == "BOARD":
+                    return self.state(gameId)
+                game = self.games[gameId]
+                if len(words) != 3 or game["who"] != 1:
+                    return "ERR not your go"
+                validMoves = [othello.indexToStr(m) for m in othello.getValidMoves(game["board"], 1)]
+                if words[2] not in validMoves:
+                    return "ERR invalid move " + words[2]
+                othello.makeMove(game["board"], othello.strToIndex(words[2]), 1)
+                game["who"] = 2
+                await self.playAI(gameId)
+                reply = self.state(gameId)
+                # Forget finished games, so memory only holds games in play.
+                if reply.startswith("END"):
+                    self.forget(gameId)
+                    owned.discard(gameId)
+                return reply
+        
+        return "ERR bad request: " + " ".join(words)
+    
+    async def serveClient(self, reader, writer):
+        """
+            Serves one client connection until it quits or disconnects, and then frees the games it left
+            unfinished.
+        """
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # The line was longer than the reader's limit, so the rest of the stream cannot be trusted.
+                    writer.write(b"ERR line too long\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                reply = await self.handle(line.decode("utf8", "replace").split(), owned)
+                if reply is None:
+                    break
+                writer.write((reply + "\n").encode("utf8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for gameId in owned:
+                self.forget(gameId)
+            writer.close()
+
+async def serve(host, port, workers, time_ms):
+    """
+        Runs the game server forever.
+        
+        @param host: The host to listen on.
+        @param port: The port to listen on.
+        @param workers: The number of processes to run AI moves in.
+        @param time_ms: The time budget of the "S" player in milliseconds.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        games = GameServer(executor, time_ms)
+        server = await asyncio.start_server(games.serveClient, host, port)
+        print("Serving on", ", ".join(str(s.getsockname()) for s in server.sockets))
+        async with server:
+            await server.serve_forever()
+
+async def loadClient(host, port, ai, games, seed, latencies):
+    """
+        Plays games against the server, making random valid moves, and records the time of every move.
+        
+        @return: - Type: Integer
+                 - Content: The number of moves made.
+    """
+    rand = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    moves = 0
+    for g in range(games):
+        writer.write(("NEW %s\n" % ai).encode("utf8"))
+        await writer.drain()
+        words = (await reader.readline()).decode("utf8").split()
+        while words and words[0] == "STATE":
+            start = time.perf_counter()
+            writer.write(("MOVE %s %s\n" % (words[1], rand.choice(words[4].split(",")))).encode("utf8"))
+            await writer.drain()
+            words = (await reader.readline()).decode("utf8").split()
+            latencies.append(time.perf_counter() - start)
+            moves += 1
+        if not words or words[0] != "END":
+            raise RuntimeError(" ".join(words))
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+    return moves
+
+async def loadTest(host, port, clients, games, ai, seed):
+    """
+        Runs many clients against the server at once.
+        
+        @return: - Type: Dictionary
+                 - Content: The results, with fields "clients", "moves", "seconds", "moves_per_sec",
+                            "p50_ms", "p99_ms" and "p999_ms" of the human move to AI reply latency.
+    """
+    latencies = list()
+    start = time.perf_counter()
+    counts = await asyncio.gather(*[loadClient(host, port, ai, games, seed + c, latencies) for c in range(clients)])
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    def pick(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+    return {"clients": clients, "moves": sum(counts), "seconds": round(seconds, 3),
+            "moves_per_sec": round(sum(counts) / seconds, 1),
+            "p50_ms": pick(0.5), "p99_ms": pick(0.99), "p999_ms": pick(0.999)}
+
+def main():
+    parser = argparse.ArgumentParser(description = "Othello game server and load tester.")
+    sub = parser.add_subparsers(dest = "command", required = True)
+    
+    srv = sub.add_parser("serve", help = "Run the game server.")
+    srv.add_argument("--host", default = "127.0.0.1")
+    srv.add_argument("--port", type = int, default = 7777)
+    srv.add_argument("--workers", type = int, default = None, help = "AI processes, one per CPU by default.")
+    srv.add_argument("--time-ms", type = int, default = 100, help = "Time budget per move for the 'S' player.")
+    
+    load = sub.add_parser("loadtest", help = "Play many games against a running server at once.")
+    load.add_argument("--host", default = "127.0.0.1")
+    load.add_argument("--port", type = int, default = 7777)
+    load.add_argument("--clients", type = int, default = 100)
+    load.add_argument("--games", type = int, default = 1, help = "Games played by each client.")
+    load.add_argument("--ai", choices = ["C", "A", "S", "B"], default = "C")
+    load.add_argument("--seed", type = int, default = 0)
+    
+    args = parser.parse_args()
+    if args.command == "serve":
+        asyncio.run(serve(args.host, args.port, args.workers, args.time_ms))
+    else:
+        print(json.dumps(asyncio.run(loadTest(args.host, args.port, args.clients, args.games, args.ai, args.seed))))
+
+if __name__ == "__main__":
+    main()
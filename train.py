@@ -0,0 +1,262 @@
+"""
+Trains the pattern evaluation weights of the Othello module from self-play games.
+Positions are streamed from game files (or played on the fly) in fixed size chunks, so the data never has to
+fit in memory, and the weights are fitted by stochastic gradient descent over the sparse pattern features
+with NumPy. The result is a weight file for "othello.setPatternWeights".
+Run as a program, e.g: "python train.py -o weights.bin --games games.jsonl --epochs 4".
+"""
+
+import argparse
+import json
+import sys
+from array import array
+
+import numpy as np
+
+import othello
+import records
+import selfplay
+
+# Offset of each pattern type's weights in a flat weight vector.
+TYPE_OFFSETS = np.concatenate(([0], np.cumsum(othello.PATTERN_SIZES)[:-1])).astype(np.int64)
+# Number of weights of one stage.
+STAGE_SIZE = int(sum(othello.PATTERN_SIZES))
+# Flat weight offset of every pattern copy, in PATTERN_INSTANCES order. A copy's index is mapped by
+# "othello.canonicalPatternIndexes" before the offset is added, so mirror images train the same weight.
+INSTANCE_OFFSETS = TYPE_OFFSETS[list(othello.PATTERN_TYPES)]
+# Default log2 of the number of slots of a SeenPositions table, i.e 4M slots of 8 bytes, or 32MB.
+DEDUP_BITS = 22
+
+class SeenPositions:
+    """
+        A fixed size table of the hashes of positions already trained on, so that memory use does not grow
+        with the number of games. Each hash has one slot, which a new hash overwrites, so the dedup is only
+        approximate: a repeated position whose slot has since been taken is trained on again.
+    """
+    
+    def __init__(self, bits = DEDUP_BITS):
+        """
+            @param bits: The log2 of the number of slots.
+        """
+        self.mask = (1 << bits) - 1
+        self.keys = array("Q", [0]) * (1 << bits)
+    
+    def add(self, key):
+        """
+            Adds a hash to the table.
+            
+            @param key: The 64-bit hash of a position.
+            @return: - Type: Boolean
+                     - Content: True if the hash was already in the table.
+        """
+        # An empty slot holds 0, so a hash of 0 is stored as 1.
+        key = key or 1
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            return True
+        self.keys[slot] = key
+        return False
+
+def replayPositions(moves, score, solveEmpties = 0, seen = None):
+    """
+        Generator which replays a game from the start, yielding the pattern indexes and label of every position.
+        
+        @param moves: A list of (row, column) moves, with an empty tuple for a pass.
+        @param score: The final "scoreBoard" of the game.
+        @param solveEmpties: Positions with this many empty squares or fewer are labelled with their exact
+                             endgame score instead of the game's final score.
+        @param seen: A SeenPositions of the canonical hashes of positions already yielded, which is added to,
+                     so that positions (or symmetric copies of them) repeated across games are only yielded
+                     once, as far as the table remembers them. None to yield every position.
+        @yield: - Type: Tuple
+                - Content: A tuple (indexes, discs, label), where "indexes" are the canonical pattern indexes
+                           from "othello.canonicalPatternIndexes" and "label" is from player 1's point of view in
+                           hundredths of a disc, as returned by "othello.evaluatePatterns".
+    """
+    board = othello.newGame("C", "C")["board"]
+    p1Bits, p2Bits = othello.boardToBits(board)
+    indexes = othello.patternIndexes(p1Bits, p2Bits)
+    who = 1
+    discs = 4
+    for move in moves:
+        if move != tuple():
+            sq = move[0]*8 + move[1]
+            own, opp = (p1Bits, p2Bits) if who == 1 else (p2Bits, p1Bits)
+            flips = othello.getFlipsBits(own, opp, sq)
+            othello.patternMove(indexes, who, sq, flips)
+            own |= flips | (1 << sq)
+            opp ^= flips
+            p1Bits, p2Bits = (own, opp) if who == 1 else (opp, own)
+            discs += 1
+            # Skip positions already yielded, including symmetric copies of them. The hash is from the point
+            # of view of the next player to move, so the same pieces with the other player to move differ.
+            repeated = seen is not None and seen.add(othello.canonicalHash(opp, own)[0])
+            if not repeated:
+                label = score
+                if 64 - discs <= solveEmpties:
+                    search = {"deadline": float("inf"), "nodes": 0}
+                    # Solve from the point of view of the next player to move, then convert to player 1's.
+                    label = othello.solveBits(opp, own, -othello.INFINITY, othello.INFINITY, search)
+                    label = -label if who == 1 else label
+                yield othello.canonicalPatternIndexes(indexes), discs, 100 * label
+        who = 3 - who
+
+def jsonGames(path):
+    """
+        Generator which reads games written by "selfplay.py".
+        
+        @yield: - Type: Tuple
+                - Content: A tuple (moves, score) of each game.
+    """
+    with open(path, "rt", encoding = "utf8") as f:
+        for line in f:
+            game = json.loads(line)
+            moves = [othello.strToIndex(m) if m is not None else tuple() for m in game["moves"]]
+            yield moves, game["score"]
+
+def recordGames(path):
+    """
+        Generator which reads games from a record file, replaying each one to find its final score.
+        Games that do not start from the new game position are skipped.
+        
+        @yield: - Type: Tuple
+                - Content: A tuple (moves, score) of each game.
+    """
+    start = othello.newGame("C", "C")["board"]
+    for game in records.readGames(path):
+        if game["board"] != start or game["who"] != 1:
+            continue
+        board = [line[:] for line in start]
+        who = 1
+        for move in game["moves"]:
+            if move != tuple():
+                othello.makeMove(board, move, who)
+            who = 3 - who
+        yield game["moves"], othello.scoreBoard(board)
+
+def selfPlayGames(player1, player2, games, seed, workers):
+    """
+        Generator which plays games on the fly with "selfplay.simulate".
+        
+        @yield: - Type: Tuple
+                - Content: A tuple (moves, score) of each game.
+    """
+    for game in selfplay.simulate(selfplay.playerFunction(player1), selfplay.playerFunction(player2),
+                                  games, seed, workers):
+        yield [othello.strToIndex(m) if m is not None else tuple() for m in game["moves"]], game["score"]
+
+def chunks(games, stages, size, solveEmpties = 0, dedup = False, dedupBits = DEDUP_BITS):
+    """
+        Generator which turns a stream of games into fixed size chunks of training data.
+        
+        @param games: An iterable of (moves, score) tuples.
+        @param stages: The number of game stages with their own weights.
+        @param size: The number of positions in each chunk.
+        @param solveEmpties: As in "replayPositions".
+        @param dedup: Whether to skip positions seen before in the stream, including symmetric copies. This is
+                      approximate, as only a fixed size SeenPositions table of them is kept.
+        @param dedupBits: The log2 of the number of slots of the SeenPositions table.
+        @yield: - Type: Tuple
+                - Content: A tuple (features, labels), where "features" is an (n, 46) int64 array of the flat
+                           weight index of every pattern copy of each position, and "labels" an (n,) float array.
+    """
+    features = list()
+    labels = list()
+    seen = SeenPositions(dedupBits) if dedup else None
+    for moves, score in games:
+        for indexes, discs, label in replayPositions(moves, score, solveEmpties, seen):
+            features.append(othello.patternStage(discs, stages) * STAGE_SIZE + INSTANCE_OFFSETS + indexes)
+            labels.append(label)
+            if len(labels) == size:
+                yield np.array(features), np.array(labels, dtype = np.float64)
+                features = list()
+                labels = list()
+    if labels:
+        yield np.array(features), np.array(labels, dtype = np.float64)
+
+def trainChunk(weights, features, labels, rate):
+    """
+        Makes one gradient step on a chunk, in place. Each weight's step is divided by the number of times it
+        appears in the chunk, so rare patterns learn as fast as common ones, and by the number of pattern
+        copies, since every copy of a position moves its prediction.
+        
+        @param weights: The flat float weight vector of every stage.
+        @param features: An (n, 46) array of flat weight indexes, from "chunks".
+        @param labels: An (n,) array of labels.
+        @param rate: The learning rate.
+        @return: - Type: Float
+                 - Content: The mean squared error of the chunk before the step.
+    """
+    errors = labels - weights[features].sum(axis = 1)
+    flat = features.ravel()
+    gradient = np.bincount(flat, weights = np.repeat(errors, features.shape[1]), minlength = weights.size)
+    counts = np.bincount(flat, minlength = weights.size)
+    weights += rate * gradient / (np.maximum(counts, 1) * features.shape[1])
+    return float(np.mean(errors ** 2))
+
+def train(makeGames, stages = 4, epochs = 1, chunkSize = 100000, rate = 0.5, solveEmpties = 0, log = None,
+          dedup = False, dedupBits = DEDUP_BITS):
+    """
+        Trains pattern weights over a stream of games.
+        
+        @param makeGames: A function returning a new iterable of (moves, score) tuples for each epoch.
+        @param stages: The number of game stages with their own weights.
+        @param epochs: The number of passes over the games.
+        @param chunkSize: The number of positions in each gradient step.
+        @param rate: The learning rate.
+        @param solveEmpties: As in "replayPositions".
+        @param log: A file to write the error of each chunk to, or None.
+        @param dedup: As in "chunks". Each epoch starts afresh.
+        @param dedupBits: As in "chunks".
+        @return: - Type: List
+                 - Content: The weights in the form taken by "othello.writePatternWeights".
+    """
+    weights = np.zeros(stages * STAGE_SIZE)
+    for epoch in range(epochs):
+        for n, (features, labels) in enumerate(chunks(makeGames(), stages, chunkSize, solveEmpties, dedup,
+                                                      dedupBits)):
+            mse = trainChunk(weights, features, labels, rate)
+            if log is not None:
+                log.write(json.dumps({"epoch": epoch, "chunk": n, "positions": len(labels), "mse": round(mse, 1)}) + "\n")
+    
+    rounded = np.clip(np.rint(weights), -32768, 32767).astype(np.int16)
+    return [[rounded[s*STAGE_SIZE + TYPE_OFFSETS[t]:s*STAGE_SIZE + TYPE_OFFSETS[t] + size]
+             for t, size in enumerate(othello.PATTERN_SIZES)]
+            for s in range(stages)]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Train Othello pattern weights from self-play games.")
+    parser.add_argument("-o", "--output", required = True, help = "The weight file to write.")
+    parser.add_argument("--games", nargs = "*", default = [], help = "JSON lines game files from selfplay.py.")
+    parser.add_argument("--records", nargs = "*", default = [], help = "Game record files from records.py.")
+    parser.add_argument("--selfplay", type = int, default = 0, help = "Games to play on the fly instead of reading files.")
+    parser.add_argument("--players", nargs = 2, default = ["A", "C"], help = "AI letters for on the fly games.")
+    parser.add_argument("--workers", type = int, default = 1)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--stages", type = int, default = 4)
+    parser.add_argument("--epochs", type = int, default = 1)
+    parser.add_argument("--chunk", type = int, default = 100000, help = "Positions per gradient step.")
+    parser.add_argument("--rate", type = float, default = 0.5)
+    parser.add_argument("--solve-empties", type = int, default = 0,
+                        help = "Label positions with this many empties or fewer by exact search.")
+    parser.add_argument("--dedup", action = "store_true",
+                        help = "Train on each position once, counting symmetric copies as the same position. "
+                               "Approximate, as only a fixed size table of seen positions is kept.")
+    parser.add_argument("--dedup-bits", type = int, default = DEDUP_BITS,
+                        help = "Log2 of the slots of the seen position table, each of 8 bytes.")
+    args = parser.parse_args()
+    
+    def makeGames():
+        for path in args.games:
+            yield from jsonGames(path)
+        for path in args.records:
+            yield from recordGames(path)
+        if args.selfplay:
+            yield from selfPlayGames(args.players[0], args.players[1], args.selfplay, args.seed, args.workers)
+    
+    weights = train(makeGames, args.stages, args.epochs, args.chunk, args.rate, args.solve_empties, sys.stderr,
+                    args.dedup, args.dedup_bits)
+    othello.writePatternWeights(args.output, weights)
+
+if __name__ == "__main__":
+    main()